@@ -1,7 +1,7 @@
 'use client';
 
 import { useEffect, useState } from 'react';
-import { supabase, FiActivity, FiSleep, Walk } from '@/lib/supabase';
+import { supabase, FiActivity, FiActivityRollup, FiSleep, Walk } from '@/lib/supabase';
 import { 
   Activity, 
   TrendingUp, 
@@ -20,6 +20,7 @@ export default function ActivityPage() {
   const [activities, setActivities] = useState<FiActivity[]>([]);
   const [sleepData, setSleepData] = useState<FiSleep[]>([]);
   const [recentWalks, setRecentWalks] = useState<Walk[]>([]);
+  const [weeklyRollups, setWeeklyRollups] = useState<FiActivityRollup[]>([]);
   const [loading, setLoading] = useState(true);
   const [syncing, setSyncing] = useState(false);
   const [syncStatus, setSyncStatus] = useState<{
@@ -64,6 +65,14 @@ export default function ActivityPage() {
         .order('start_time', { ascending: false })
         .limit(10);
 
+      // Longer trends come from the rollups fi-sync.py maintains, not raw rows
+      const { data: rollups } = await supabase
+        .from('bailey_fi_activity_rollups')
+        .select('*')
+        .eq('period', 'week')
+        .order('period_start', { ascending: false })
+        .limit(8);
+
       if (activityData) {
         setActivities(activityData);
         calculateWeekStats(activityData);
@@ -71,6 +80,7 @@ export default function ActivityPage() {
       
       if (sleepRecords) setSleepData(sleepRecords);
       if (walks) setRecentWalks(walks);
+      if (rollups) setWeeklyRollups(rollups);
 
     } catch (error) {
       console.error('Error loading activity data:', error);
@@ -133,7 +143,8 @@ export default function ActivityPage() {
       setSyncStatus({
         success: result.success,
         message: result.success 
-          ? `Synced! ${result.data?.steps || 0} steps today (${result.data?.goalPercent || 0}% of goal)` 
+          ? `Synced! ${result.data?.steps || 0} steps today (${result.data?.goalPercent || 0}% of goal)`
+            + (result.cached ? ` · collar data from ${result.ageSeconds}s ago` : '')
           : (result.error || 'Sync failed'),
       });
 
@@ -351,6 +362,42 @@ export default function ActivityPage() {
             </div>
           </div>
 
+          {/* Weekly Trend */}
+          {weeklyRollups.length > 0 && (
+            <div className="bg-white rounded-2xl shadow-lg p-8 mb-8">
+              <h3 className="text-2xl font-bold mb-6 text-[var(--primary)]">
+                📅 Weekly Trend (Last {weeklyRollups.length} Weeks)
+              </h3>
+              <div className="space-y-3">
+                {weeklyRollups.map((week) => (
+                  <div key={week.period_start} className="flex items-center justify-between p-4 bg-gray-50 rounded-xl">
+                    <div className="font-medium">
+                      Week of {format(new Date(week.period_start + 'T00:00:00'), 'MMM d')}
+                    </div>
+                    <div className="flex gap-6 text-right">
+                      <div>
+                        <div className="text-sm text-gray-500">Avg Steps</div>
+                        <div className="font-bold">{week.avg_steps.toLocaleString()}</div>
+                      </div>
+                      <div>
+                        <div className="text-sm text-gray-500">Walks</div>
+                        <div className="font-bold">{week.total_walks}</div>
+                      </div>
+                      <div>
+                        <div className="text-sm text-gray-500">Goal Days</div>
+                        <div className="font-bold">{week.goal_days}/{week.days_tracked}</div>
+                      </div>
+                      <div>
+                        <div className="text-sm text-gray-500">Avg Sleep</div>
+                        <div className="font-bold">{week.avg_sleep_minutes} min</div>
+                      </div>
+                    </div>
+                  </div>
+                ))}
+              </div>
+            </div>
+          )}
+
           {/* Recent Walks */}
           {recentWalks.length > 0 && (
             <div className="bg-white rounded-2xl shadow-lg p-8">
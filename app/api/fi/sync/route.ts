@@ -1,8 +1,16 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { supabase, FiSnapshot } from '@/lib/supabase';
 
 const FI_BASE = 'https://api.tryfi.com';
 const BAILEY_PET_ID = '5dnzqk6ykXz7kDTkOFjYKw';
 
+// Serve the snapshot fi-sync.py publishes each tick while it is younger than this;
+// by default one daemon interval plus 5 minutes of slack for the tick itself
+const SYNC_INTERVAL_MINUTES = Number(process.env.FI_SYNC_INTERVAL_MINUTES || '15');
+const SNAPSHOT_MAX_AGE_SECONDS = Number(
+  process.env.FI_SNAPSHOT_MAX_AGE_SECONDS || (SYNC_INTERVAL_MINUTES + 5) * 60
+);
+
 const ACTIVITY_FRAGMENTS = `
 fragment ActivitySummaryDetails on ActivitySummary { __typename start end totalSteps stepGoal totalDistance }
 `;
@@ -78,8 +86,65 @@ async function fiQuery(cookie: string, query: string): Promise<any> {
   return res.json();
 }
 
+async function readSnapshot(): Promise<FiSnapshot | null> {
+  try {
+    const { data } = await supabase
+      .from('bailey_fi_snapshot')
+      .select('*')
+      .eq('pet_id', BAILEY_PET_ID)
+      .limit(1);
+    return data?.[0] || null;
+  } catch {
+    // Table not migrated yet (or no Supabase env): fall back to a live fetch
+    return null;
+  }
+}
+
+function snapshotToData(snapshot: FiSnapshot) {
+  return {
+    name: snapshot.name || 'Bailey',
+    breed: snapshot.breed || 'American Pit Bull Terrier',
+    weight: snapshot.weight,
+    photo: snapshot.photo_url,
+    steps: snapshot.steps,
+    dailyGoal: snapshot.daily_goal || 13500,
+    goalPercent: snapshot.daily_goal ? Math.round((snapshot.steps / snapshot.daily_goal) * 100) : 0,
+    distance: snapshot.distance_meters,
+    weeklySteps: snapshot.weekly_steps,
+    weeklyDistance: snapshot.weekly_distance_meters,
+    activityType: snapshot.activity_type || 'Unknown',
+    activityStart: snapshot.activity_start,
+    totalActivitySteps: snapshot.activity_steps,
+    location: snapshot.location || 'Unknown',
+    lat: snapshot.latitude,
+    lng: snapshot.longitude,
+    battery: snapshot.signal_strength_percent,
+    connectionType: snapshot.connection_type || 'Unknown',
+    connectionDate: snapshot.connection_date,
+    ledColor: snapshot.led_color,
+    ledHex: snapshot.led_hex,
+    lastSync: snapshot.fetched_at,
+  };
+}
+
 export async function POST(request: NextRequest) {
   try {
+    // A fresh snapshot from the sync daemon answers without touching Fi;
+    // ?refresh=true forces a live fetch
+    const forceRefresh = request.nextUrl.searchParams.get('refresh') === 'true';
+    if (!forceRefresh) {
+      const snapshot = await readSnapshot();
+      const ageSeconds = snapshot ? (Date.now() - new Date(snapshot.fetched_at).getTime()) / 1000 : Infinity;
+      if (snapshot && ageSeconds <= SNAPSHOT_MAX_AGE_SECONDS) {
+        return NextResponse.json({
+          success: true,
+          cached: true,
+          ageSeconds: Math.round(ageSeconds),
+          data: snapshotToData(snapshot),
+        });
+      }
+    }
+
     const fiEmail = process.env.FI_EMAIL;
     const fiPassword = process.env.FI_PASSWORD;
 
@@ -134,33 +199,64 @@ export async function POST(request: NextRequest) {
       location = activity.place.name || activity.place.address || location;
     }
 
-    return NextResponse.json({
-      success: true,
-      data: {
-        name: pet.name || 'Bailey',
-        breed: pet.breed?.name || 'American Pit Bull Terrier',
-        weight: pet.weight,
-        photo: pet.photos?.first?.image?.fullSize || null,
-        steps: daily.totalSteps || 0,
-        dailyGoal: daily.stepGoal || 13500,
-        goalPercent: daily.stepGoal ? Math.round(((daily.totalSteps || 0) / daily.stepGoal) * 100) : 0,
-        distance: daily.totalDistance || 0,
-        weeklySteps: weekly.totalSteps || 0,
-        weeklyDistance: weekly.totalDistance || 0,
-        activityType: activity.__typename || 'Unknown',
-        activityStart: activity.start || null,
-        totalActivitySteps: activity.totalSteps || 0,
-        location,
-        lat,
-        lng,
-        battery: connection.__typename === 'ConnectedToCellular' ? connection.signalStrengthPercent : null,
-        connectionType: connection.__typename || 'Unknown',
-        connectionDate: connection.date || null,
-        ledColor: device.ledColor?.name || null,
-        ledHex: device.ledColor?.hexCode || null,
-        lastSync: new Date().toISOString(),
-      },
-    });
+    const fetchedAt = new Date().toISOString();
+    const data = {
+      name: pet.name || 'Bailey',
+      breed: pet.breed?.name || 'American Pit Bull Terrier',
+      weight: pet.weight,
+      photo: pet.photos?.first?.image?.fullSize || null,
+      steps: daily.totalSteps || 0,
+      dailyGoal: daily.stepGoal || 13500,
+      goalPercent: daily.stepGoal ? Math.round(((daily.totalSteps || 0) / daily.stepGoal) * 100) : 0,
+      distance: daily.totalDistance || 0,
+      weeklySteps: weekly.totalSteps || 0,
+      weeklyDistance: weekly.totalDistance || 0,
+      activityType: activity.__typename || 'Unknown',
+      activityStart: activity.start || null,
+      totalActivitySteps: activity.totalSteps || 0,
+      location,
+      lat,
+      lng,
+      battery: connection.__typename === 'ConnectedToCellular' ? connection.signalStrengthPercent : null,
+      connectionType: connection.__typename || 'Unknown',
+      connectionDate: connection.date || null,
+      ledColor: device.ledColor?.name || null,
+      ledHex: device.ledColor?.hexCode || null,
+      lastSync: fetchedAt,
+    };
+
+    // Refresh the shared snapshot so other devices get this fetch too
+    // supabase-js reports a failed write in `error` rather than throwing
+    const { error: snapshotError } = await supabase.from('bailey_fi_snapshot').upsert({
+      pet_id: BAILEY_PET_ID,
+      name: data.name,
+      breed: data.breed,
+      weight: data.weight ?? null,
+      photo_url: data.photo,
+      steps: data.steps,
+      daily_goal: daily.stepGoal ?? null,
+      distance_meters: data.distance,
+      weekly_steps: data.weeklySteps,
+      weekly_distance_meters: data.weeklyDistance,
+      activity_type: activity.__typename || null,
+      activity_start: data.activityStart,
+      activity_steps: data.totalActivitySteps,
+      location: data.location,
+      latitude: lat,
+      longitude: lng,
+      connection_type: connection.__typename || null,
+      connection_date: data.connectionDate,
+      signal_strength_percent: data.battery ?? null,
+      led_color: data.ledColor,
+      led_hex: data.ledHex,
+      source: 'route',
+      fetched_at: fetchedAt,
+    }, { onConflict: 'pet_id' });
+    if (snapshotError) {
+      console.error('Fi snapshot write failed:', snapshotError);
+    }
+
+    return NextResponse.json({ success: true, cached: false, data });
 
   } catch (error: any) {
     console.error('Fi sync error:', error);
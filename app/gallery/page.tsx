@@ -414,7 +414,11 @@ export default function GalleryPage() {
           >
             <div className="relative aspect-square rounded-2xl overflow-hidden shadow-lg hover:shadow-xl transition-shadow">
               <img
-                src={photo.url}
+                src={photo.thumb_url || photo.url}
+                width={photo.thumb_width ?? undefined}
+                height={photo.thumb_height ?? undefined}
+                loading="lazy"
+                decoding="async"
                 alt={photo.caption || 'Bailey photo'}
                 className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-300"
               />
@@ -457,11 +461,18 @@ export default function GalleryPage() {
             <X className="w-6 h-6" />
           </button>
           <div className="max-w-4xl w-full">
-            <img
-              src={selectedPhoto.url}
-              alt={selectedPhoto.caption || 'Bailey photo'}
-              className="w-full h-auto rounded-2xl shadow-2xl"
-            />
+            <picture>
+              {selectedPhoto.webp_url && (
+                <source srcSet={selectedPhoto.webp_url} type="image/webp" />
+              )}
+              <img
+                src={selectedPhoto.medium_url || selectedPhoto.url}
+                width={selectedPhoto.medium_width ?? undefined}
+                height={selectedPhoto.medium_height ?? undefined}
+                alt={selectedPhoto.caption || 'Bailey photo'}
+                className="w-full h-auto rounded-2xl shadow-2xl"
+              />
+            </picture>
             {selectedPhoto.caption && (
               <div className="mt-6 text-center">
                 <p className="text-white text-xl font-medium mb-2">
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Bailey Dashboard - Fi Sleep Compaction
+One-time cleanup of duplicate bailey_fi_sleep rows left by insert-only syncs
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    print("ERROR: python-dotenv not installed. Run: pip install python-dotenv")
+    sys.exit(1)
+
+try:
+    import requests
+except ImportError:
+    print("ERROR: requests not installed. Run: pip install requests")
+    sys.exit(1)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+SUPABASE_URL = (os.getenv('NEXT_PUBLIC_SUPABASE_URL') or '').rstrip('/')
+SUPABASE_ANON_KEY = os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY')
+
+PAGE_SIZE = 1000
+DELETE_CHUNK = 200
+
+
+def natural_key(row: Dict[str, Any]) -> tuple:
+    """(start_time, sleep_type) with the timestamp normalized to UTC"""
+    start = datetime.fromisoformat(str(row['start_time']).replace('Z', '+00:00'))
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return start.astimezone(timezone.utc), row['sleep_type']
+
+
+def keeper_rank(row: Dict[str, Any]) -> tuple:
+    """Sort key for the copy to keep: latest end, longest, newest (as in the migration)"""
+    return (str(row.get('end_time') or ''), row.get('duration_minutes') or 0,
+            str(row.get('created_at') or ''))
+
+
+def fetch_sleep_rows(session: requests.Session) -> List[Dict[str, Any]]:
+    """All bailey_fi_sleep rows, paged by id"""
+    rows, last_id = [], None
+    while True:
+        params = {
+            'select': 'id,start_time,sleep_type,end_time,duration_minutes,created_at',
+            'order': 'id.asc',
+            'limit': str(PAGE_SIZE)
+        }
+        if last_id:
+            params['id'] = f'gt.{last_id}'
+        resp = session.get(f"{SUPABASE_URL}/rest/v1/bailey_fi_sleep", params=params, timeout=30)
+        resp.raise_for_status()
+        page = resp.json()
+        # A short page isn't the end: PostgREST's max-rows can cap it below PAGE_SIZE
+        if not page:
+            return rows
+        rows += page
+        last_id = page[-1]['id']
+
+
+def find_duplicates(rows: List[Dict[str, Any]]) -> List[str]:
+    """Ids of every copy except the keeper in each (start_time, sleep_type) group"""
+    groups: Dict[tuple, List[Dict]] = {}
+    for row in rows:
+        groups.setdefault(natural_key(row), []).append(row)
+    
+    duplicates = []
+    for copies in groups.values():
+        if len(copies) > 1:
+            copies.sort(key=keeper_rank, reverse=True)
+            duplicates += [row['id'] for row in copies[1:]]
+    return duplicates
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Remove duplicate bailey_fi_sleep rows')
+    parser.add_argument('--apply', action='store_true', help='Delete the duplicates (default: report only)')
+    args = parser.parse_args()
+    
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        print("❌ Missing Supabase credentials in .env.local")
+        sys.exit(1)
+    
+    session = requests.Session()
+    session.headers.update({
+        'apikey': SUPABASE_ANON_KEY,
+        'Authorization': f'Bearer {SUPABASE_ANON_KEY}',
+        'Content-Type': 'application/json'
+    })
+    
+    print("😴 Scanning bailey_fi_sleep for duplicates...")
+    rows = fetch_sleep_rows(session)
+    duplicates = find_duplicates(rows)
+    print(f"  {len(rows)} rows, {len(duplicates)} duplicates, {len(rows) - len(duplicates)} unique periods")
+    
+    if not duplicates:
+        print("✅ Nothing to compact")
+        return
+    if not args.apply:
+        print("ℹ️  Run again with --apply to delete the duplicates")
+        return
+    
+    deleted = 0
+    for i in range(0, len(duplicates), DELETE_CHUNK):
+        chunk = duplicates[i:i + DELETE_CHUNK]
+        resp = session.delete(
+            f"{SUPABASE_URL}/rest/v1/bailey_fi_sleep",
+            params={'id': f"in.({','.join(chunk)})"},
+            headers={'Prefer': 'return=minimal'},
+            timeout=30
+        )
+        resp.raise_for_status()
+        deleted += len(chunk)
+        print(f"  🗑️  Deleted {deleted}/{len(duplicates)}")
+    
+    print("✅ Compaction complete. Now run supabase/migrations/fi_sleep_natural_key.sql")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,797 @@
+#!/usr/bin/env python3
+"""
+Bailey Dashboard - Fi Sync Benchmark
+Runs fi-sync.py offline against local stand-ins for Supabase (PostgREST) and
+the Fi API, and reports requests, wall time, peak RSS and rows per second
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit, parse_qsl
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNC_SCRIPT = os.path.join(SCRIPT_DIR, 'fi-sync.py')
+
+# Unique constraints from the schema files, used for upserts and conflicts
+UNIQUE_KEYS = {
+    'bailey_fi_activity': [('date',)],
+    'bailey_walks': [('fi_walk_id',)],
+    'bailey_fi_locations': [('walk_id', 'timestamp')],
+    'bailey_fi_sleep': [('start_time', 'sleep_type')],
+    'bailey_fi_sync_state': [('stream',)],
+    'bailey_fi_activity_rollups': [('period', 'period_start')],
+    'bailey_fi_snapshot': [('pet_id',)]
+}
+
+# Scripted scenarios: days of synthetic history, points in the ongoing walk
+# (walks: False means no walks at all, ongoing or finished), extra
+# fi-sync.py arguments (a backfill scenario runs --backfill over the days
+# instead of --days), whether an untimed run seeds the database first, and
+# injected faults (every Nth Supabase request fails with 503, the first N Fi
+# GraphQL requests get a 429 with Retry-After)
+SCENARIOS = {
+    'cron-7d': {'days': 7, 'walk_points': 600, 'args': ['--full']},
+    'flaky-7d': {'days': 7, 'walk_points': 600, 'args': ['--full'],
+                 'faults': {'supabase_503_every': 4, 'fi_429_first': 2}},
+    'cron-7d-incremental': {'days': 7, 'walk_points': 600, 'args': [], 'warmup': True},
+    'cron-7d-incremental-no-walks': {'days': 7, 'walk_points': 0, 'walks': False, 'args': [], 'warmup': True},
+    'cron-7d-incremental-walk-grows': {'days': 7, 'walk_points': 600, 'walk_grows': 600, 'args': [],
+                                       'warmup': True},
+    'backfill-365d': {'days': 365, 'walk_points': 600, 'args': ['--full']},
+    'backfill-365d-sharded': {'days': 365, 'walk_points': 600, 'backfill': True,
+                              'args': ['--shard-days', '30']},
+    'walk-10k': {'days': 1, 'walk_points': 10000, 'args': ['--full']}
+}
+
+
+class Counters:
+    """Thread-safe request/byte counters for one fake service"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests: Dict[str, int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rows_written = 0
+
+    def record(self, key: str, bytes_in: int, bytes_out: int, rows: int = 0):
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.rows_written += rows
+
+    def total(self) -> int:
+        return sum(self.requests.values())
+
+
+class FakePostgREST:
+    """In-memory tables with the PostgREST semantics SupabaseClient relies on
+
+    Supports insert, upsert (merge/ignore duplicates with on_conflict),
+    select with eq/neq/gt/gte/lt/lte/is/in/not filters, and=(...)/or=(...), order,
+    limit/offset and column lists, and PATCH and DELETE with the same filters.
+    Like Supabase, a select returns at most MAX_ROWS rows whatever limit it
+    asks for.
+    """
+
+    MAX_ROWS = 1000
+
+    def __init__(self, fail_every: int = 0):
+        self.lock = threading.Lock()
+        self.fail_every = fail_every
+        self.received = 0
+        self.tables: Dict[str, List[Dict]] = {}
+        self.indexes: Dict[str, Dict[tuple, Dict[tuple, Dict]]] = {}
+        self.counters = Counters()
+
+    # -- storage ---------------------------------------------------------
+
+    def _index(self, table: str, cols: tuple) -> Dict[tuple, Dict]:
+        return self.indexes.setdefault(table, {}).setdefault(cols, {})
+
+    def _find(self, table: str, row: Dict, cols: tuple) -> Optional[Dict]:
+        key = tuple(row.get(col) for col in cols)
+        if None in key:
+            return None
+        return self._index(table, cols).get(key)
+
+    def _store(self, table: str, row: Dict):
+        self.tables.setdefault(table, []).append(row)
+        for cols in UNIQUE_KEYS.get(table, []):
+            key = tuple(row.get(col) for col in cols)
+            if None not in key:
+                self._index(table, cols)[key] = row
+
+    def _reindex(self, table: str, row: Dict, before: Dict):
+        for cols in UNIQUE_KEYS.get(table, []):
+            old_key = tuple(before.get(col) for col in cols)
+            self._index(table, cols).pop(old_key, None)
+            new_key = tuple(row.get(col) for col in cols)
+            if None not in new_key:
+                self._index(table, cols)[new_key] = row
+
+    def write(self, table: str, rows: List[Dict], resolution: str, on_conflict: str) -> tuple:
+        """Insert or upsert rows; returns (status, stored rows)"""
+        conflict_cols = tuple(on_conflict.split(',')) if on_conflict else ('id',)
+        written = []
+
+        with self.lock:
+            for incoming in rows:
+                existing = self._find(table, incoming, conflict_cols) if resolution else None
+                if existing is None:
+                    for cols in UNIQUE_KEYS.get(table, []):
+                        if self._find(table, incoming, cols) is not None:
+                            return 409, [{'code': '23505', 'message': f'duplicate key violates unique {cols}'}]
+                    row = {'id': str(uuid.uuid4()), 'created_at': datetime.now(timezone.utc).isoformat()}
+                    row.update(incoming)
+                    self._store(table, row)
+                    written.append(row)
+                elif resolution == 'merge-duplicates':
+                    before = dict(existing)
+                    existing.update(incoming)
+                    self._reindex(table, existing, before)
+                    written.append(existing)
+
+        return 201, written
+
+    # -- queries ---------------------------------------------------------
+
+    @staticmethod
+    def _coerce(value: Any) -> Any:
+        if isinstance(value, (int, float)) or value is None or isinstance(value, bool):
+            return value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return str(value)
+
+    @classmethod
+    def _compare(cls, left: Any, op: str, right: str) -> bool:
+        if op == 'is':
+            if right == 'null':
+                return left is None
+            return left is (right == 'true')
+        if op == 'in':
+            options = next(csv.reader([right.strip('()')]))
+            return str(left) in options
+        if left is None:
+            return False
+
+        right = right.strip('"')
+        a, b = cls._coerce(left), cls._coerce(right)
+        if type(a) is not type(b):
+            a, b = str(left), right
+        if op == 'eq':
+            return a == b
+        if op == 'neq':
+            return a != b
+        if op == 'gt':
+            return a > b
+        if op == 'gte':
+            return a >= b
+        if op == 'lt':
+            return a < b
+        if op == 'lte':
+            return a <= b
+        raise ValueError(f"Unsupported operator: {op}")
+
+    @classmethod
+    def _matches(cls, row: Dict, col: str, expr: str) -> bool:
+        if col in ('and', 'or'):
+            parts = [cls._split_condition(part) for part in cls._split_list(expr)]
+            test = all if col == 'and' else any
+            return test(cls._matches(row, c, e) for c, e in parts)
+        negate = expr.startswith('not.')
+        if negate:
+            expr = expr[4:]
+        op, _, value = expr.partition('.')
+        result = cls._compare(row.get(col), op, value)
+        return not result if negate else result
+
+    @staticmethod
+    def _split_list(expr: str) -> List[str]:
+        """'(a.eq.1,and(b.gt."x,y",c.lt.2))' -> ['a.eq.1', 'and(b.gt."x,y",c.lt.2)']"""
+        parts, depth, quoted, current = [], 0, False, ''
+        for char in expr.strip()[1:-1]:
+            if char == '"':
+                quoted = not quoted
+            elif not quoted and char == '(':
+                depth += 1
+            elif not quoted and char == ')':
+                depth -= 1
+            elif not quoted and not depth and char == ',':
+                parts.append(current)
+                current = ''
+                continue
+            current += char
+        return parts + [current] if current else parts
+
+    @staticmethod
+    def _split_condition(part: str) -> tuple:
+        """'date.gte.X' -> ('date', 'gte.X'); 'and(...)' -> ('and', '(...)')"""
+        for logic in ('and(', 'or('):
+            if part.startswith(logic):
+                return logic[:-1], part[len(logic) - 1:]
+        col, _, rest = part.partition('.')
+        return col, rest
+
+    @classmethod
+    def _split_and(cls, expr: str) -> List[tuple]:
+        """and=(date.gte.X,date.lte.Y) -> [('date', 'gte.X'), ...]"""
+        return [cls._split_condition(part) for part in cls._split_list(expr)]
+
+    def inject_fault(self) -> bool:
+        """True if this request should fail with a 503"""
+        with self.lock:
+            self.received += 1
+            return bool(self.fail_every) and self.received % self.fail_every == 0
+    
+    def select(self, table: str, params: List[tuple], max_rows: Optional[int] = MAX_ROWS) -> List[Dict]:
+        filters, columns, order, limit, offset = [], None, [], None, 0
+        for key, value in params:
+            if key == 'select':
+                columns = [c.strip() for c in value.split(',') if c.strip() and c.strip() != '*']
+            elif key == 'order':
+                order = [part.split('.') for part in value.split(',')]
+            elif key == 'limit':
+                limit = int(value)
+            elif key == 'offset':
+                offset = int(value)
+            elif key == 'and':
+                filters += self._split_and(value)
+            elif key not in ('on_conflict', 'columns'):
+                filters.append((key, value))
+
+        with self.lock:
+            rows = [row for row in self.tables.get(table, [])
+                    if all(self._matches(row, col, expr) for col, expr in filters)]
+
+        for spec in reversed(order):
+            col, desc = spec[0], len(spec) > 1 and spec[1] == 'desc'
+            rows.sort(key=lambda r: (r.get(col) is None, self._coerce(r.get(col))), reverse=desc)
+        rows = rows[offset:]
+        caps = [cap for cap in (limit, max_rows) if cap is not None]
+        if caps:
+            rows = rows[:min(caps)]
+        if columns:
+            rows = [{col: row.get(col) for col in columns} for row in rows]
+        return rows
+
+    def patch(self, table: str, params: List[tuple], data: Dict) -> List[Dict]:
+        matched = self.select(table, [(k, v) for k, v in params if k != 'select'], max_rows=None)
+        ids = {row['id'] for row in matched}
+        updated = []
+        with self.lock:
+            for row in self.tables.get(table, []):
+                if row['id'] in ids:
+                    before = dict(row)
+                    row.update(data)
+                    self._reindex(table, row, before)
+                    updated.append(row)
+        return updated
+
+    def delete(self, table: str, params: List[tuple]) -> List[Dict]:
+        matched = self.select(table, [(k, v) for k, v in params if k != 'select'], max_rows=None)
+        ids = {row['id'] for row in matched}
+        deleted = []
+        with self.lock:
+            kept = []
+            for row in self.tables.get(table, []):
+                if row['id'] not in ids:
+                    kept.append(row)
+                    continue
+                for cols in UNIQUE_KEYS.get(table, []):
+                    self._index(table, cols).pop(tuple(row.get(col) for col in cols), None)
+                deleted.append(row)
+            self.tables[table] = kept
+        return deleted
+
+
+class FakeFi:
+    """Fi API stand-in: cookie login and the GraphQL feeds fi-sync.py reads
+
+    It answers the way the real API does: currentActivitySummary only
+    covers the current day/week/month, and older history comes from the
+    cursor-paged feeds, at most FEED_PAGE_CAP items per page whatever
+    limit the query asks for. History has one finished walk a day; with
+    `walks` off there are no walks at all, ongoing or finished. With
+    `walk_grows`, walk_on() lets the ongoing walk go on that many seconds.
+    """
+
+    PET_ID = 'bench-pet'
+    FEED_PAGE_CAP = 50
+    WALK_POINTS = 180  # Finished walks: 30 minutes at one fix every 10 s
+
+    def __init__(self, days: int, walk_points: int, seed: int = 7, throttle_first: int = 0,
+                 walks: bool = True, walk_grows: int = 0):
+        self.counters = Counters()
+        self.throttle_left = throttle_first
+        self.lock = threading.Lock()
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        rng = random.Random(seed)
+
+        self.days = []
+        for i in range(days + 1):
+            day = (self.now - timedelta(days=i)).replace(hour=0, minute=0, second=0)
+            self.days.append({
+                'date': day,
+                'steps': rng.randint(4000, 16000),
+                'goal': 13500,
+                'sleep': rng.randint(7 * 3600, 10 * 3600),
+                'nap': rng.randint(3600, 3 * 3600)
+            })
+
+        # One finished morning walk per past day, and one ongoing walk sampled at 1 Hz
+        self.walks = []
+        self.positions = []
+        self.later_positions = []
+        self.walk_grows = walk_grows
+        self.walk_start = self.now - timedelta(seconds=walk_points)
+        if walks:
+            for d in self.days[1:]:
+                start = d['date'] + timedelta(hours=7)
+                end = start + timedelta(seconds=self.WALK_POINTS * 10)
+                self.walks.append({
+                    '__typename': 'Walk',
+                    'id': f"bench-walk-{start:%Y%m%d}",
+                    'start': start.isoformat(),
+                    'end': end.isoformat(),
+                    'areaName': 'Bench Park',
+                    'totalSteps': self.WALK_POINTS * 20,
+                    'distance': self.WALK_POINTS * 12.0,
+                    'positions': self.track(rng, start, self.WALK_POINTS, 10)
+                })
+            self.later_positions = self.track(rng, self.walk_start, walk_points + walk_grows, 1)
+            self.positions = self.later_positions[:walk_points]
+
+    def walk_on(self):
+        """Move the clock on by walk_grows seconds, with the ongoing walk still going"""
+        with self.lock:
+            self.now += timedelta(seconds=self.walk_grows)
+            self.positions = self.later_positions
+
+    @staticmethod
+    def track(rng: random.Random, start: datetime, points: int, interval: int) -> List[Dict]:
+        """GPS fixes drifting like a dog on a leash, with a pause every 15 minutes"""
+        lat, lon = 40.7128, -74.0060
+        heading = rng.uniform(0, 2 * math.pi)
+        positions = []
+        for i in range(points):
+            heading += rng.gauss(0, 0.15)
+            step = 0 if 120 <= (i * interval) % 900 < 240 else 1.4 * interval
+            lat += step * math.cos(heading) / 111195
+            lon += step * math.sin(heading) / (111195 * math.cos(math.radians(lat)))
+            positions.append({
+                '__typename': 'Location',
+                'date': (start + timedelta(seconds=i * interval)).isoformat(),
+                'errorRadius': rng.randint(3, 15),
+                'position': {'__typename': 'Position', 'latitude': round(lat, 7), 'longitude': round(lon, 7)}
+            })
+        return positions
+
+    def summary(self, days: List[Dict]) -> Dict:
+        return {
+            '__typename': 'ActivitySummary',
+            'start': days[-1]['date'].isoformat(),
+            'end': (days[0]['date'] + timedelta(days=1)).isoformat(),
+            'totalSteps': sum(d['steps'] for d in days),
+            'stepGoal': days[0]['goal'],
+            'totalDistance': sum(d['steps'] for d in days) * 0.6,
+            'dailySteps': [
+                {'__typename': 'DailySteps', 'date': d['date'].strftime('%Y-%m-%d'),
+                 'totalSteps': d['steps'], 'stepGoal': d['goal']}
+                for d in days
+            ]
+        }
+
+    def activity_summary(self, period: str) -> Dict:
+        """The current day, week (from Monday) or calendar month, like the real endpoint"""
+        today = self.days[0]['date']
+        first = {
+            'DAILY': today,
+            'WEEKLY': today - timedelta(days=today.weekday()),
+            'MONTHLY': today.replace(day=1)
+        }[period]
+        return self.summary([d for d in self.days if d['date'] >= first])
+
+    def months(self) -> List[Dict]:
+        """Monthly summaries, newest first"""
+        months: Dict[str, List[Dict]] = {}
+        for d in self.days:
+            months.setdefault(d['date'].strftime('%Y-%m'), []).append(d)
+        return [self.summary(days) for days in months.values()]
+
+    def rest_summaries(self) -> List[Dict]:
+        return [
+            {
+                '__typename': 'RestSummary',
+                'start': d['date'].isoformat(),
+                'end': (d['date'] + timedelta(days=1)).isoformat(),
+                'data': {'__typename': 'ConcreteRestSummaryData', 'sleepAmounts': [
+                    {'__typename': 'SleepAmount', 'type': 'SLEEP', 'duration': d['sleep']},
+                    {'__typename': 'SleepAmount', 'type': 'NAP', 'duration': d['nap']}
+                ]}
+            }
+            for d in self.days
+        ]
+
+    def activity_items(self) -> List[Dict]:
+        """Finished activities, newest first; rests are mixed in as in the app's feed"""
+        items = []
+        for walk in self.walks:
+            items.append(walk)
+            items.append({'__typename': 'Rest', 'id': walk['id'].replace('walk', 'rest'),
+                          'start': walk['end'], 'end': walk['end']})
+        return items
+
+    def page(self, typename: str, items_key: str, items: List[Dict], cursor: Optional[str], limit: int) -> Dict:
+        """One cursor page; the cursor is the offset of the next page"""
+        offset = int(cursor or 0)
+        end = offset + min(limit, self.FEED_PAGE_CAP)
+        return {
+            '__typename': typename,
+            'cursor': str(end) if end < len(items) else None,
+            items_key: items[offset:end]
+        }
+
+    def ongoing(self) -> Optional[Dict]:
+        if not self.positions:
+            return {'__typename': 'OngoingRest', 'start': self.walk_start.isoformat(), 'areaName': 'Home',
+                    'lastReportTimestamp': self.now.isoformat(), 'totalSteps': 0,
+                    'position': {'__typename': 'Position', 'latitude': 40.7128, 'longitude': -74.0060},
+                    'place': {'__typename': 'Place', 'name': 'Home', 'address': None}}
+        return {
+            '__typename': 'OngoingWalk',
+            'start': self.walk_start.isoformat(),
+            'areaName': 'Bench Park',
+            'lastReportTimestamp': self.now.isoformat(),
+            'totalSteps': len(self.positions) * 2,
+            'distance': len(self.positions) * 1.2,
+            'positions': self.positions
+        }
+
+    @staticmethod
+    def fields(query: str, field: str):
+        """(response key, cursor, limit) for each use of a field, honouring aliases"""
+        pattern = r'(?:(\w+)\s*:\s*)?' + field + r'\s*(?:\(([^)]*)\))?'
+        for match in re.finditer(pattern, query):
+            args = match.group(2) or ''
+            cursor = re.search(r'cursor:\s*(?:"([^"]*)"|null)', args)
+            limit = re.search(r'limit:\s*(\d+)', args)
+            period = re.search(r'period:\s*(\w+)', args)
+            yield (match.group(1) or field, cursor.group(1) if cursor else None,
+                   int(limit.group(1)) if limit else 1, period.group(1) if period else None)
+
+    def answer(self, query: str) -> Dict:
+        """Build a response containing every pet field the query asks for
+
+        Fields come back under the query's aliases (dailyStat, restFeed, ...)
+        when it uses them, as a real GraphQL server would.
+        """
+        if 'currentUser' in query:
+            return {'currentUser': {'__typename': 'User', 'userHouseholds': [
+                {'__typename': 'UserHousehold', 'household': {'__typename': 'Household', 'pets': [
+                    {'__typename': 'Pet', 'id': self.PET_ID, 'name': 'Bailey'}
+                ]}}
+            ]}}
+
+        pet: Dict[str, Any] = {'__typename': 'Pet'}
+        for key, _, _, period in self.fields(query, 'currentActivitySummary'):
+            pet[key] = self.activity_summary(period or 'DAILY')
+        for key, cursor, limit, _ in self.fields(query, 'activitySummaryFeed'):
+            pet[key] = self.page('ActivitySummaryFeed', 'activitySummaries', self.months(), cursor, limit)
+        for key, cursor, limit, _ in self.fields(query, 'restSummaryFeed'):
+            pet[key] = self.page('RestSummaryFeed', 'restSummaries', self.rest_summaries(), cursor, limit)
+        for key, cursor, limit, _ in self.fields(query, 'activityFeed'):
+            pet[key] = self.page('ActivityFeed', 'activities', self.activity_items(), cursor, limit)
+        for key, _, _, _ in self.fields(query, 'ongoingActivity'):
+            pet[key] = self.ongoing()
+        if re.search(r'\bdevice\s*\{', query):
+            pet['device'] = {
+                '__typename': 'Device',
+                'lastConnectionState': {'__typename': 'ConnectedToCellular', 'date': self.now.isoformat(),
+                                        'signalStrengthPercent': 80},
+                'ledColor': {'__typename': 'LedColor', 'name': 'Blue', 'hexCode': '#0000FF'}
+            }
+        return {'pet': pet}
+
+
+def make_handler(postgrest: Optional[FakePostgREST] = None, fi: Optional[FakeFi] = None):
+    """HTTP handler class bound to one fake service"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _read(self) -> bytes:
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+
+        def _send(self, status: int, payload: Any, extra_headers: Optional[Dict] = None) -> int:
+            body = b'' if payload is None else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (extra_headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+            return len(body)
+
+        def _prefer(self) -> Dict[str, str]:
+            prefs = {}
+            for part in (self.headers.get('Prefer') or '').split(','):
+                key, _, value = part.strip().partition('=')
+                prefs[key] = value
+            return prefs
+
+        def _route(self, method: str):
+            url = urlsplit(self.path)
+            params = parse_qsl(url.query, keep_blank_values=True)
+            raw = self._read() if method in ('POST', 'PATCH') else b''
+
+            if fi is not None:
+                self._fi(url.path, raw)
+                return
+
+            table = url.path.rsplit('/', 1)[-1]
+            prefs = self._prefer()
+            
+            if postgrest.inject_fault():
+                sent = self._send(503, {'message': 'injected fault'})
+                postgrest.counters.record(f'{method} {table} (503)', len(raw), sent)
+                return
+
+            if method == 'GET':
+                sent = self._send(200, postgrest.select(table, params))
+                postgrest.counters.record(f'GET {table}', len(raw), sent)
+            elif method == 'POST':
+                data = json.loads(raw or b'null')
+                rows = data if isinstance(data, list) else [data]
+                on_conflict = dict(params).get('on_conflict', '')
+                status, written = postgrest.write(table, rows, prefs.get('resolution', ''), on_conflict)
+                payload = written if prefs.get('return') == 'representation' or status >= 400 else None
+                sent = self._send(status, payload)
+                postgrest.counters.record(f'POST {table}', len(raw), sent, len(written) if status < 400 else 0)
+            elif method == 'PATCH':
+                updated = postgrest.patch(table, params, json.loads(raw or b'{}'))
+                payload = updated if prefs.get('return') == 'representation' else None
+                sent = self._send(200, payload)
+                postgrest.counters.record(f'PATCH {table}', len(raw), sent, len(updated))
+            elif method == 'DELETE':
+                deleted = postgrest.delete(table, params)
+                payload = deleted if prefs.get('return') == 'representation' else None
+                sent = self._send(200 if payload is not None else 204, payload)
+                postgrest.counters.record(f'DELETE {table}', len(raw), sent)
+
+        def _fi(self, path: str, raw: bytes):
+            if path == '/auth/login':
+                sent = self._send(200, {'userId': 'bench-user', 'sessionId': 'bench-session'},
+                                  {'Set-Cookie': 'fi.sid=bench-session; Path=/'})
+                fi.counters.record('POST /auth/login', len(raw), sent)
+                return
+
+            if 'fi.sid=bench-session' not in (self.headers.get('Cookie') or ''):
+                sent = self._send(401, {'errors': [{'message': 'Not authenticated'}]})
+                fi.counters.record('POST /graphql (401)', len(raw), sent)
+                return
+
+            with fi.lock:
+                throttled = fi.throttle_left > 0
+                fi.throttle_left -= throttled
+            if throttled:
+                sent = self._send(429, {'errors': [{'message': 'Too many requests'}]}, {'Retry-After': '1'})
+                fi.counters.record('POST /graphql (429)', len(raw), sent)
+                return
+            
+            query = json.loads(raw or b'{}').get('query', '')
+            sent = self._send(200, {'data': fi.answer(query)})
+            fi.counters.record('POST /graphql', len(raw), sent)
+
+        def do_GET(self):
+            self._route('GET')
+
+        def do_POST(self):
+            self._route('POST')
+
+        def do_PATCH(self):
+            self._route('PATCH')
+
+        def do_DELETE(self):
+            self._route('DELETE')
+
+    return Handler
+
+
+def start_server(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_sync(env: Dict[str, str], args: List[str], workdir: str, verbose: bool) -> Dict[str, Any]:
+    """Run fi-sync.py once; returns wall time, peak RSS, exit code and the window it synced"""
+    log_path = os.path.join(workdir, 'sync.log')
+    started = time.perf_counter()
+
+    with open(log_path, 'w') as log:
+        proc = subprocess.Popen([sys.executable, SYNC_SCRIPT] + args, cwd=workdir, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    wall = time.perf_counter() - started
+    with open(log_path) as log:
+        output = log.read()
+    if verbose or proc.returncode:
+        print(output if verbose else '\n'.join(output.splitlines()[-20:]))
+
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    window = 'incremental' if 'Incremental sync from' in output else 'backfill' if '--backfill' in args else 'full'
+    return {'wall_s': wall, 'peak_rss_mb': rss_mb, 'exit_code': proc.returncode, 'window': window}
+
+
+def run_scenario(name: str, verbose: bool = False) -> Dict[str, Any]:
+    """Run one scenario against fresh fake services"""
+    scenario = SCENARIOS[name]
+    faults = scenario.get('faults', {})
+    postgrest = FakePostgREST(faults.get('supabase_503_every', 0))
+    fi = FakeFi(scenario['days'], scenario['walk_points'], throttle_first=faults.get('fi_429_first', 0),
+                walks=scenario.get('walks', True), walk_grows=scenario.get('walk_grows', 0))
+    supabase_server = start_server(make_handler(postgrest=postgrest))
+    fi_server = start_server(make_handler(fi=fi))
+    workdir = tempfile.mkdtemp(prefix=f'fi-bench-{name}-')
+
+    env = dict(os.environ)
+    env.update({
+        'FI_EMAIL': 'bench@example.com',
+        'FI_PASSWORD': 'bench',
+        'FI_API_BASE': f'http://127.0.0.1:{fi_server.server_port}',
+        'FI_SESSION_CACHE': os.path.join(workdir, 'fi-session.json'),
+        'NEXT_PUBLIC_SUPABASE_URL': f'http://127.0.0.1:{supabase_server.server_port}',
+        'NEXT_PUBLIC_SUPABASE_ANON_KEY': 'bench-key',
+        'DRY_RUN': 'false'
+    })
+    if scenario.get('backfill'):
+        end = datetime.now().date()
+        args = ['--backfill', f"{end - timedelta(days=scenario['days'])}..{end}"] + scenario['args']
+    else:
+        args = ['--type', 'manual', '--days', str(scenario['days'])] + scenario['args']
+
+    try:
+        if scenario.get('warmup'):
+            warmup = run_sync(env, args + ['--full'], workdir, verbose)
+            if warmup['exit_code']:
+                raise RuntimeError(f"{name}: warmup run failed")
+            postgrest.counters.reset()
+            fi.counters.reset()
+            if scenario.get('walk_grows'):
+                fi.walk_on()
+
+        result = run_sync(env, args, workdir, verbose)
+    finally:
+        supabase_server.shutdown()
+        fi_server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    rows = postgrest.counters.rows_written
+    result.update({
+        'scenario': name,
+        'warmup': bool(scenario.get('warmup')),
+        'supabase_requests': postgrest.counters.total(),
+        'fi_requests': fi.counters.total(),
+        'requests_by_endpoint': dict(sorted({**postgrest.counters.requests, **fi.counters.requests}.items())),
+        'rows_written': rows,
+        # Rows in the fake database afterwards, to spot days or walks the sync never got
+        'rows_stored': {table: len(postgrest.tables.get(table, [])) for table in
+                        ('bailey_fi_activity', 'bailey_walks', 'bailey_fi_sleep', 'bailey_fi_locations')},
+        'rows_per_s': rows / result['wall_s'] if result['wall_s'] else 0.0,
+        'bytes_sent': postgrest.counters.bytes_in + fi.counters.bytes_in,
+        'bytes_received': postgrest.counters.bytes_out + fi.counters.bytes_out
+    })
+    return result
+
+
+def print_result(result: Dict[str, Any]):
+    status = '✅' if not result['exit_code'] else f"❌ exit {result['exit_code']}"
+    print(f"\n📊 {result['scenario']} {status}")
+    print(f"  📅 Window:        {result['window']}" + (' (expected incremental)' if result.get('warmup') and
+                                                          result['window'] != 'incremental' else ''))
+    print(f"  ⏱️  Wall time:     {result['wall_s']:.2f}s")
+    print(f"  🧠 Peak RSS:      {result['peak_rss_mb']:.1f} MB")
+    print(f"  🌐 Requests:      {result['supabase_requests']} Supabase, {result['fi_requests']} Fi")
+    print(f"  💾 Rows written:  {result['rows_written']} ({result['rows_per_s']:.0f} rows/s)")
+    print("  🗂️  Rows stored:   " + ', '.join(f"{table.replace('bailey_', '')} {n}"
+                                                for table, n in result['rows_stored'].items()))
+    print(f"  📦 Bytes:         {result['bytes_sent']} sent, {result['bytes_received']} received")
+    for endpoint, count in result['requests_by_endpoint'].items():
+        print(f"      {count:5d}  {endpoint}")
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> bool:
+    """Print deltas against a saved baseline; True if anything regressed"""
+    regressed = False
+    by_name = {r['scenario']: r for r in baseline.get('results', [])}
+
+    print(f"\n📈 Compared with baseline from {baseline.get('created_at', 'unknown')}")
+    for result in results:
+        base = by_name.get(result['scenario'])
+        if not base:
+            print(f"  {result['scenario']}: no baseline")
+            continue
+
+        for key, limit in (('wall_s', threshold), ('peak_rss_mb', threshold),
+                           ('supabase_requests', 0.0), ('fi_requests', 0.0)):
+            old, new = base.get(key) or 0, result.get(key) or 0
+            change = (new - old) / old if old else 0.0
+            worse = change > limit
+            regressed |= worse
+            marker = '❌' if worse else '✅'
+            print(f"  {marker} {result['scenario']} {key}: {old:.2f} → {new:.2f} ({change:+.0%})")
+
+    return regressed
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark fi-sync.py against local fake Supabase and Fi')
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--save-baseline', metavar='PATH', help='Write results as a baseline JSON file')
+    parser.add_argument('--compare', metavar='PATH', help='Compare results with a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed wall time / RSS growth before flagging a regression (default: 0.2)')
+    parser.add_argument('--verbose', action='store_true', help='Show fi-sync.py output')
+
+    args = parser.parse_args()
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    print(f"🏁 Benchmarking fi-sync.py: {', '.join(names)}")
+    results = []
+    for name in names:
+        result = run_scenario(name, args.verbose)
+        print_result(result)
+        results.append(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'created_at': datetime.now(timezone.utc).isoformat(), 'results': results}, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    failed = any(r['exit_code'] for r in results)
+    if args.compare:
+        with open(args.compare) as f:
+            failed |= compare(results, json.load(f), args.threshold)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,9 @@
 # Bailey Dashboard - Fi Collar Auto-Sync Cron Script
 # Add to crontab to run daily at 6 AM:
 # 0 6 * * * /path/to/bailey-dashboard/fi-sync-cron.sh >> /path/to/bailey-dashboard/logs/fi-sync.log 2>&1
+#
+# For syncs every few minutes, run `python3 fi-sync.py --daemon` as a service
+# instead (see "Daemon Mode" in FI_INTEGRATION_README.md).
 
 # Get script directory
 SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
@@ -50,13 +50,14 @@ class SupabaseClient:
             return None
         return resp.json() if resp.text else None
     
-    def upsert(self, table: str, data: Union[Dict, List[Dict]]):
+    def upsert(self, table: str, data: Union[Dict, List[Dict]], on_conflict: str = ''):
         """Upsert data (insert or update on conflict)"""
         headers = self.headers.copy()
         headers['Prefer'] = 'resolution=merge-duplicates,return=representation'
+        params = {'on_conflict': on_conflict} if on_conflict else None
         
         url = f"{self.url}/rest/v1/{table}"
-        resp = requests.post(url, headers=headers, json=data)
+        resp = requests.post(url, headers=headers, json=data, params=params)
         if resp.status_code not in (200, 201):
             print(f"Upsert failed ({resp.status_code}): {resp.text}")
             return None
@@ -183,9 +184,10 @@ def sync_fi_data(dry_run: bool = False, sync_type: str = 'manual'):
                 sleep_data['duration_minutes'] = int(duration.total_seconds() / 60)
             
             if dry_run:
-                print(f"  [DRY RUN] Would insert sleep: {sleep_data}")
+                print(f"  [DRY RUN] Would upsert sleep: {sleep_data}")
             else:
-                result = supabase.insert('bailey_fi_sleep', sleep_data)
+                # Same rest every tick until it ends: update it in place
+                result = supabase.upsert('bailey_fi_sleep', sleep_data, on_conflict='start_time,sleep_type')
                 if result:
                     stats['sleep_records'] += 1
                     print(f"  ✅ {sleep_type.title()} synced: {sleep_data['duration_minutes']} minutes")
@@ -7,17 +7,18 @@ Syncs activity, walks, sleep, and location data from Fi collar to Supabase
 import os
 import sys
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 import json
+import hashlib
+import time
+import random
+from email.utils import parsedate_to_datetime
+from itertools import islice, count
 import asyncio
-
-try:
-    from pytryfi import PyTryFi
-    from pytryfi.fiHousehold import FiHousehold
-    from pytryfi.pet import Pet
-except ImportError:
-    print("ERROR: pytryfi not installed. Run: pip install pytryfi")
-    sys.exit(1)
+import signal
+import sqlite3
+import threading
+from contextlib import contextmanager, redirect_stdout
 
 try:
     from dotenv import load_dotenv
@@ -27,10 +28,30 @@ except ImportError:
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     print("ERROR: requests not installed. Run: pip install requests")
     sys.exit(1)
 
+try:
+    import httpx
+except ImportError:
+    print("ERROR: httpx not installed. Run: pip install httpx")
+    sys.exit(1)
+
+# HTTP/2 for Supabase needs the optional h2 package (pip install 'httpx[http2]')
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: numpy not installed. Run: pip install numpy")
+    sys.exit(1)
+
 # Load environment variables
 load_dotenv('.env.local')
 
@@ -38,6 +59,13 @@ load_dotenv('.env.local')
 FI_EMAIL = os.getenv('FI_EMAIL')
 FI_PASSWORD = os.getenv('FI_PASSWORD')
 
+# Fi API session
+FI_API_BASE = os.getenv('FI_API_BASE', 'https://api.tryfi.com').rstrip('/')
+FI_PET_ID = os.getenv('FI_PET_ID')  # Skips the pet lookup when set
+FI_PET_NAME = os.getenv('FI_PET_NAME', 'Bailey')
+FI_SESSION_CACHE = os.getenv('FI_SESSION_CACHE', '.fi-session.json')
+FI_SESSION_TTL_HOURS = float(os.getenv('FI_SESSION_TTL_HOURS', '24'))
+
 # Supabase credentials
 SUPABASE_URL = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
 SUPABASE_ANON_KEY = os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY')
@@ -46,33 +74,718 @@ SUPABASE_ANON_KEY = os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY')
 DAYS_TO_SYNC = int(os.getenv('FI_SYNC_DAYS', '7'))  # Default to last 7 days
 DRY_RUN = os.getenv('DRY_RUN', 'false').lower() == 'true'
 
+# HTTP connection pool tuning for Supabase
+SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '10'))  # Max keep-alive connections
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '5'))  # Seconds
+SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', '30'))  # Seconds
+
+# Request scheduling per upstream: token bucket rate limits (0 disables)
+FI_RATE_LIMIT_RPS = float(os.getenv('FI_RATE_LIMIT_RPS', '5'))
+SUPABASE_RATE_LIMIT_RPS = float(os.getenv('SUPABASE_RATE_LIMIT_RPS', '20'))
+
+# Retries with jittered exponential backoff on 429/5xx and connection errors
+MAX_RETRIES = int(os.getenv('FI_SYNC_MAX_RETRIES', '5'))
+RETRY_BASE_DELAY = float(os.getenv('FI_SYNC_RETRY_BASE_DELAY', '0.5'))  # Seconds
+RETRY_MAX_DELAY = float(os.getenv('FI_SYNC_RETRY_MAX_DELAY', '30'))  # Seconds, also caps Retry-After
+
+# Circuit breaker: consecutive failures before an upstream fails fast, and for how long
+BREAKER_THRESHOLD = int(os.getenv('FI_SYNC_BREAKER_THRESHOLD', '5'))
+BREAKER_COOLDOWN = float(os.getenv('FI_SYNC_BREAKER_COOLDOWN', '30'))  # Seconds
+
+# Rows per bulk POST when flushing buffered writes
+BATCH_SIZE = int(os.getenv('FI_SYNC_BATCH_SIZE', '500'))
+
+# Max chunks written at the same time (days are fetched one after another)
+CONCURRENCY = int(os.getenv('FI_SYNC_CONCURRENCY', '4'))
+
+# Daemon mode: minutes between sync ticks
+SYNC_INTERVAL_MINUTES = float(os.getenv('FI_SYNC_INTERVAL_MINUTES', '15'))
+
+# Re-read this much data before each stream's watermark on incremental runs
+OVERLAP_HOURS = float(os.getenv('FI_SYNC_OVERLAP_HOURS', '6'))
+
+# GPS track reduction before points are stored
+TRACK_TOLERANCE_M = float(os.getenv('FI_TRACK_TOLERANCE_M', '5'))  # 0 keeps every point
+STORE_POLYLINE = os.getenv('FI_STORE_POLYLINE', 'false').lower() == 'true'  # Needs bailey_walks.path_polyline
+
+# Walk metrics: slower than this counts as stopped, and a stop must last this long
+STOP_SPEED_MPS = float(os.getenv('FI_STOP_SPEED_MPS', '0.3'))
+STOP_MIN_SECONDS = float(os.getenv('FI_STOP_MIN_SECONDS', '60'))
+
+# Weekly/monthly rollups of activity and sleep, recomputed for the periods each run touches
+ROLLUPS_ENABLED = os.getenv('FI_SYNC_ROLLUPS', 'true').lower() == 'true'  # Needs bailey_fi_activity_rollups
+
+# Latest collar state for dashboards, upserted after each tick (needs bailey_fi_snapshot)
+PUBLISH_SNAPSHOT = os.getenv('FI_PUBLISH_SNAPSHOT', 'true').lower() == 'true'
+
+# Backfill: days per shard, resume checkpoints and per-shard logs
+BACKFILL_SHARD_DAYS = int(os.getenv('FI_BACKFILL_SHARD_DAYS', '30'))
+BACKFILL_STATE = os.getenv('FI_BACKFILL_STATE', '.fi-backfill.json')
+BACKFILL_LOG_DIR = os.getenv('FI_BACKFILL_LOG_DIR', 'logs/backfill')
+
+# Columnar archive written by `fi-sync.py export`: <dir>/<table>/month=YYYY-MM/part.parquet
+EXPORT_DIR = os.getenv('FI_EXPORT_DIR', 'archive/fi')
+EXPORT_PAGE_SIZE = int(os.getenv('FI_EXPORT_PAGE_SIZE', '1000'))  # Larger pages are capped at PostgREST's max-rows
+EXPORT_ROW_GROUP = int(os.getenv('FI_EXPORT_ROW_GROUP', '50000'))  # Rows buffered per Parquet row group
+
+# Local write-ahead spool: rows wait here until Supabase accepts them (empty disables)
+SPOOL_PATH = os.getenv('FI_SPOOL_PATH', '.fi-spool.db')
+# Failed writes a spooled row survives before it moves to the dead-letter table
+SPOOL_MAX_ATTEMPTS = int(os.getenv('FI_SPOOL_MAX_ATTEMPTS', '5'))
+
+# Per-run metrics: one JSON line per run, plus an optional Prometheus textfile
+METRICS_FILE = os.getenv('FI_METRICS_FILE', 'logs/fi-sync-metrics.jsonl')  # Empty disables
+METRICS_PROM_FILE = os.getenv('FI_METRICS_PROM_FILE', '')  # e.g. /var/lib/node_exporter/fi_sync.prom
+
+# Responses worth retrying; 429 waits but doesn't count towards the breaker
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Request latency histogram bucket bounds (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+EARTH_RADIUS_M = 6371008.8
+MPS_TO_MPH = 2.2369363
+
+# Which stats counter each synced table feeds
+TABLE_STATS = {
+    'bailey_fi_activity': 'activities',
+    'bailey_walks': 'walks',
+    'bailey_fi_sleep': 'sleep_records',
+    'bailey_fi_locations': 'locations'
+}
+
+# Exported tables: partition/keyset column and the columns kept, with their types
+EXPORT_TABLES = {
+    'bailey_fi_activity': ('date', {
+        'id': 'str', 'date': 'date', 'total_steps': 'int', 'total_distance_meters': 'float',
+        'total_calories': 'int', 'walk_count': 'int', 'rest_minutes': 'int', 'nap_minutes': 'int',
+        'active_minutes': 'int', 'play_minutes': 'int', 'daily_goal_steps': 'int',
+        'goal_achieved': 'bool', 'synced_at': 'timestamp', 'created_at': 'timestamp'
+    }),
+    'bailey_walks': ('date', {
+        'id': 'str', 'date': 'date', 'fi_walk_id': 'str', 'duration_minutes': 'int', 'steps': 'int',
+        'distance_meters': 'float', 'calories': 'int', 'start_time': 'timestamp',
+        'end_time': 'timestamp', 'avg_speed_mph': 'float', 'location': 'str', 'notes': 'str',
+        'synced_from_fi': 'bool', 'created_at': 'timestamp'
+    }),
+    'bailey_fi_sleep': ('date', {
+        'id': 'str', 'date': 'date', 'sleep_type': 'str', 'start_time': 'timestamp',
+        'end_time': 'timestamp', 'duration_minutes': 'int', 'quality_score': 'int',
+        'created_at': 'timestamp'
+    }),
+    'bailey_fi_locations': ('timestamp', {
+        'id': 'str', 'walk_id': 'str', 'timestamp': 'timestamp', 'latitude': 'float',
+        'longitude': 'float', 'accuracy_meters': 'float', 'created_at': 'timestamp'
+    })
+}
+
+# Bookkeeping columns that change on every run; left out of row content hashes
+HASH_IGNORED_COLUMNS = {'synced_at', 'updated_at'}
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse a Fi/PostgREST timestamp into an aware UTC datetime"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def track_arrays(positions: List[Dict]) -> tuple:
+    """Fi position points -> (point indices, lat, lon, epoch seconds) arrays
+
+    Points without coordinates are skipped; a missing timestamp is NaN.
+    """
+    index, lat, lon, seconds = [], [], [], []
+    for i, point in enumerate(positions):
+        position = point.get('position') or {}
+        if position.get('latitude') is None or position.get('longitude') is None:
+            continue
+        timestamp = parse_timestamp(point.get('date'))
+        index.append(i)
+        lat.append(position['latitude'])
+        lon.append(position['longitude'])
+        seconds.append(timestamp.timestamp() if timestamp else np.nan)
+    
+    return (np.array(index, dtype=np.int64), np.array(lat, dtype=float),
+            np.array(lon, dtype=float), np.array(seconds, dtype=float))
+
+
+def walk_metrics(lat: np.ndarray, lon: np.ndarray, seconds: np.ndarray,
+                 stop_speed_mps: float = STOP_SPEED_MPS,
+                 stop_min_seconds: float = STOP_MIN_SECONDS) -> Optional[Dict[str, float]]:
+    """Distance, moving time, pace, max speed and stops for a GPS track
+
+    Everything is computed over the consecutive-point arrays at once.
+    Movement below stop_speed_mps counts as stopped, so GPS jitter while
+    standing still adds neither distance nor moving time.
+    """
+    if len(lat) < 2:
+        return None
+    
+    # Haversine distance between consecutive points
+    phi = np.radians(lat)
+    dphi = np.diff(phi)
+    dlambda = np.radians(np.diff(lon))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(dlambda / 2) ** 2
+    step = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    
+    dt = np.diff(seconds)
+    timed = np.isfinite(dt) & (dt > 0)
+    speed = np.divide(step, dt, out=np.zeros_like(step), where=timed)
+    moving = timed & (speed >= stop_speed_mps)
+    
+    distance = float(step[moving].sum()) if timed.any() else float(step.sum())
+    moving_seconds = float(dt[moving].sum())
+    duration = float(np.nanmax(seconds) - np.nanmin(seconds)) if np.isfinite(seconds).any() else 0.0
+    
+    # Stops: runs of consecutive stopped intervals lasting stop_min_seconds
+    stopped = (timed & ~moving).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], stopped, [0])))
+    run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    elapsed = np.concatenate(([0.0], np.cumsum(np.where(timed, dt, 0.0))))
+    run_seconds = elapsed[run_ends] - elapsed[run_starts]
+    long_stops = run_seconds >= stop_min_seconds
+    
+    return {
+        'distance_m': distance,
+        'duration_s': duration,
+        'moving_s': moving_seconds,
+        'avg_speed_mps': distance / moving_seconds if moving_seconds else 0.0,
+        'max_speed_mps': float(speed[moving].max()) if moving.any() else 0.0,
+        'pace_min_per_km': (moving_seconds / 60) / (distance / 1000) if distance else 0.0,
+        'stops': int(long_stops.sum()),
+        'stopped_s': float(run_seconds[long_stops].sum())
+    }
+
+
+def local_xy(lat: np.ndarray, lon: np.ndarray) -> tuple:
+    """Project lat/lon onto a flat plane in meters around the track's center
+
+    An equirectangular projection is accurate to well under a meter over
+    the few kilometers a walk covers.
+    """
+    lat0, lon0 = lat.mean(), lon.mean()
+    x = EARTH_RADIUS_M * np.radians(lon - lon0) * np.cos(np.radians(lat0))
+    y = EARTH_RADIUS_M * np.radians(lat - lat0)
+    return x, y
+
+
+def simplify_track(lat: np.ndarray, lon: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """Douglas-Peucker simplification; returns a boolean mask of points to keep
+
+    Distances for every point in a segment are computed in one NumPy
+    expression, so only the recursion itself runs in Python.
+    """
+    count = len(lat)
+    keep = np.zeros(count, dtype=bool)
+    if count <= 2 or tolerance_m <= 0:
+        keep[:] = True
+        return keep
+    
+    x, y = local_xy(lat, lon)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            # Loop back to the start point: use distance from that point
+            distance = np.hypot(px, py)
+        else:
+            distance = np.abs(dx * py - dy * px) / length
+        
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    
+    return keep
+
+
+def encode_polyline(lat: np.ndarray, lon: np.ndarray, precision: int = 5) -> str:
+    """Encode a track with Google's encoded polyline algorithm"""
+    coords = np.round(np.column_stack([lat, lon]) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    
+    chars = []
+    for value in values.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return ''.join(chars)
+
+
+def pg_error_code(error: httpx.HTTPStatusError) -> Optional[str]:
+    """PostgREST's error code (a SQLSTATE like 23514, or PGRST...), if the body has one"""
+    try:
+        body = error.response.json()
+    except ValueError:
+        return None
+    return body.get('code') if isinstance(body, dict) else None
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    """Content hash of a row, ignoring the timestamps that change every run"""
+    content = {key: value for key, value in row.items() if key not in HASH_IGNORED_COLUMNS}
+    return hashlib.blake2b(json.dumps(content, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def iter_chunks(rows, size: int):
+    """Yield lists of up to `size` items from any iterable, lazily"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def keyset_filter(keys: tuple, last: Dict[str, Any]) -> str:
+    """PostgREST or=(...) matching rows after `last` in `keys` order
+
+    (a, b) > (x, y) is a > x, or a = x and b > y. Values are quoted so
+    timestamps' colons and dots survive the logic-tree syntax.
+    """
+    def quoted(value: Any) -> str:
+        return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+    
+    terms = []
+    for i, key in enumerate(keys):
+        equal = [f"{k}.eq.{quoted(last[k])}" for k in keys[:i]]
+        after = f"{key}.gt.{quoted(last[key])}"
+        terms.append(f"and({','.join(equal + [after])})" if equal else after)
+    return f"({','.join(terms)})"
+
+
+def keyset_query(keys: tuple, columns: Optional[List[str]], params: Optional[Dict],
+                 page_size: int) -> Dict[str, Any]:
+    """First-page params for a keyset scan: only the needed columns, in key order"""
+    select = ','.join(dict.fromkeys([*columns, *keys])) if columns else '*'
+    return {**(params or {}), 'select': select,
+            'order': ','.join(f"{key}.asc" for key in keys), 'limit': page_size}
+
+
+def rollup_periods(dates) -> List[tuple]:
+    """The (period, start, end) weeks (Monday start) and months covering the dates"""
+    periods = set()
+    for day in dates:
+        week_start = day - timedelta(days=day.weekday())
+        periods.add(('week', week_start, week_start + timedelta(days=6)))
+        month_start = day.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        periods.add(('month', month_start, next_month - timedelta(days=1)))
+    return sorted(periods)
+
+
+def build_rollup(period: str, start, end, activity: List[Dict], sleep: List[Dict]) -> Dict[str, Any]:
+    """Aggregate the activity and sleep rows dated inside one period"""
+    first, last = start.isoformat(), end.isoformat()
+    days = [row for row in activity if first <= row['date'] <= last]
+    naps = [row for row in sleep if first <= row['date'] <= last]
+    
+    def total(rows: List[Dict], col: str) -> float:
+        return sum(float(row.get(col) or 0) for row in rows)
+    
+    tracked = len(days)
+    steps = int(total(days, 'total_steps'))
+    distance = round(total(days, 'total_distance_meters'), 2)
+    goal_days = sum(1 for row in days if row.get('goal_achieved'))
+    sleep_minutes = {kind: 0 for kind in ('rest', 'nap', 'deep_sleep')}
+    for row in naps:
+        if row.get('sleep_type') in sleep_minutes:
+            sleep_minutes[row['sleep_type']] += int(row.get('duration_minutes') or 0)
+    sleep_days = len({row['date'] for row in naps})
+    
+    return {
+        'period': period,
+        'period_start': first,
+        'period_end': last,
+        'days_tracked': tracked,
+        'total_steps': steps,
+        'avg_steps': round(steps / tracked) if tracked else 0,
+        'total_distance_meters': distance,
+        'avg_distance_meters': round(distance / tracked, 2) if tracked else 0,
+        'total_calories': int(total(days, 'total_calories')),
+        'total_walks': int(total(days, 'walk_count')),
+        'active_minutes': int(total(days, 'active_minutes')),
+        'play_minutes': int(total(days, 'play_minutes')),
+        'goal_days': goal_days,
+        'goal_hit_rate': round(goal_days / tracked, 4) if tracked else 0,
+        'rest_minutes': sleep_minutes['rest'],
+        'nap_minutes': sleep_minutes['nap'],
+        'deep_sleep_minutes': sleep_minutes['deep_sleep'],
+        'sleep_days': sleep_days,
+        'avg_sleep_minutes': round(sum(sleep_minutes.values()) / sleep_days) if sleep_days else 0,
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }
+
+
+class SyncMetrics:
+    """Stage timings and per-request stats for one sync run
+
+    Stages are timed with `stage()`; the HTTP clients report every request
+    through `observe_request()`. Both are called from worker threads.
+    """
+    
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block of work; repeated stages accumulate"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                stage = self.stages.setdefault(name, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+                stage['count'] += 1
+                stage['total_s'] += elapsed
+                stage['max_s'] = max(stage['max_s'], elapsed)
+    
+    def observe_request(self, service: str, endpoint: str, seconds: float, status: Optional[int],
+                        bytes_sent: int = 0, bytes_received: int = 0, retries: int = 0):
+        """Record one HTTP call; status is None when no response came back"""
+        with self.lock:
+            stats = self.requests.setdefault(service, {
+                'count': 0, 'errors': 0, 'retries': 0, 'bytes_sent': 0, 'bytes_received': 0,
+                'latency_sum_s': 0.0, 'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                'by_endpoint': {}
+            })
+            stats['count'] += 1
+            stats['errors'] += 0 if status and status < 400 else 1
+            stats['retries'] += retries
+            stats['bytes_sent'] += bytes_sent
+            stats['bytes_received'] += bytes_received
+            stats['latency_sum_s'] += seconds
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+            stats['latency_buckets'][bucket] += 1
+            stats['by_endpoint'][endpoint] = stats['by_endpoint'].get(endpoint, 0) + 1
+    
+    def stage_ms(self, name: str) -> Optional[int]:
+        stage = self.stages.get(name)
+        return int(stage['total_s'] * 1000) if stage else None
+    
+    def totals(self) -> Dict[str, int]:
+        """Request, byte and retry counts across all services"""
+        return {
+            key: sum(stats[key] for stats in self.requests.values())
+            for key in ('count', 'errors', 'retries', 'bytes_sent', 'bytes_received')
+        }
+    
+    def snapshot(self, **extra) -> Dict[str, Any]:
+        """Everything recorded so far as a JSON-ready dict"""
+        with self.lock:
+            return {
+                'started_at': self.started_at.isoformat(),
+                'duration_s': round(time.perf_counter() - self.started, 3),
+                **extra,
+                'stages': {name: {k: round(v, 4) for k, v in stage.items()} for name, stage in self.stages.items()},
+                'requests': json.loads(json.dumps(self.requests)),
+                'latency_buckets_s': list(LATENCY_BUCKETS)
+            }
+    
+    def write_json_line(self, path: str, **extra):
+        """Append this run's snapshot to a JSON lines file"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.snapshot(**extra)) + '\n')
+    
+    def write_prometheus(self, path: str, success: bool, records: Dict[str, int]):
+        """Write the run as a node_exporter textfile (replaced atomically)"""
+        snap = self.snapshot()
+        lines = [
+            '# HELP fi_sync_last_run_timestamp_seconds When the last sync run finished.',
+            '# TYPE fi_sync_last_run_timestamp_seconds gauge',
+            f'fi_sync_last_run_timestamp_seconds {time.time():.0f}',
+            '# HELP fi_sync_last_run_success Whether the last sync run succeeded.',
+            '# TYPE fi_sync_last_run_success gauge',
+            f'fi_sync_last_run_success {int(success)}',
+            '# HELP fi_sync_duration_seconds Wall time of the last sync run.',
+            '# TYPE fi_sync_duration_seconds gauge',
+            f'fi_sync_duration_seconds {snap["duration_s"]}',
+            '# HELP fi_sync_stage_seconds Time spent per stage (summed across days).',
+            '# TYPE fi_sync_stage_seconds gauge'
+        ]
+        lines += [f'fi_sync_stage_seconds{{stage="{name}"}} {stage["total_s"]}' for name, stage in snap['stages'].items()]
+        lines += ['# HELP fi_sync_records Rows synced per table in the last run.', '# TYPE fi_sync_records gauge']
+        lines += [f'fi_sync_records{{table="{name}"}} {rows}' for name, rows in records.items()]
+        
+        lines += ['# HELP fi_sync_request_duration_seconds HTTP request latency.',
+                  '# TYPE fi_sync_request_duration_seconds histogram']
+        for service, stats in snap['requests'].items():
+            cumulative = 0
+            for bound, hits in zip(list(LATENCY_BUCKETS) + ['+Inf'], stats['latency_buckets']):
+                cumulative += hits
+                lines.append(f'fi_sync_request_duration_seconds_bucket{{service="{service}",le="{bound}"}} {cumulative}')
+            lines.append(f'fi_sync_request_duration_seconds_sum{{service="{service}"}} {stats["latency_sum_s"]:.6f}')
+            lines.append(f'fi_sync_request_duration_seconds_count{{service="{service}"}} {stats["count"]}')
+        
+        for key, help_text in (('errors', 'Failed HTTP requests'), ('retries', 'HTTP request retries'),
+                               ('bytes_sent', 'Request body bytes sent'),
+                               ('bytes_received', 'Response body bytes received')):
+            lines += [f'# HELP fi_sync_request_{key} {help_text} in the last run.', f'# TYPE fi_sync_request_{key} gauge']
+            lines += [f'fi_sync_request_{key}{{service="{service}"}} {stats[key]}' for service, stats in snap['requests'].items()]
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+
+def body_size(body: Any) -> int:
+    """Length of a prepared request body (bytes, str or None)"""
+    if body is None:
+        return 0
+    return len(body.encode() if isinstance(body, str) else body)
+
+
+class CircuitOpenError(Exception):
+    """An upstream failed too often in a row; calls fail fast until it cools down"""
+
+
+class RequestScheduler:
+    """Rate limiting, retries and circuit breaking for one upstream
+
+    A token bucket spaces requests out to `rate` per second (bursting up to
+    `burst`). Retryable failures back off exponentially with full jitter, or
+    for as long as a Retry-After header asks, and a 429 pauses every caller
+    sharing the scheduler. After `breaker_threshold` consecutive failures the
+    circuit opens and calls raise CircuitOpenError until `breaker_cooldown`
+    has passed; then one trial request decides whether it closes again.
+
+    State is guarded by a threading lock so one scheduler can be shared by
+    worker threads (`run`) and the event loop (`arun`).
+    """
+    
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None,
+                 max_retries: int = MAX_RETRIES, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, breaker_threshold: int = BREAKER_THRESHOLD,
+                 breaker_cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst or rate, 1)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = max(breaker_threshold, 1)
+        self.breaker_cooldown = breaker_cooldown
+        
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.retries = 0
+        self.lock = threading.Lock()
+    
+    def reserve(self) -> tuple:
+        """Take a token; returns (seconds to wait before sending, whether this is the half-open trial)
+
+        Raises CircuitOpenError while the breaker is open.
+        """
+        with self.lock:
+            now = time.monotonic()
+            trial = False
+            
+            if self.opened_at is not None:
+                remaining = self.breaker_cooldown - (now - self.opened_at)
+                if remaining > 0 or self.trial_running:
+                    raise CircuitOpenError(f"{self.name} circuit open, retry in {max(remaining, 0):.0f}s")
+                self.trial_running = trial = True  # Half-open: let one request through
+            
+            wait = max(self.paused_until - now, 0.0)
+            if self.rate > 0:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1
+                if self.tokens < 0:
+                    wait = max(wait, -self.tokens / self.rate)
+            return wait, trial
+    
+    def abandon(self, trial: bool):
+        """Release the half-open trial when its request ended without an outcome
+
+        A decoding error or a cancelled task never reaches outcome(); without
+        this the breaker would stay open for good.
+        """
+        if trial:
+            with self.lock:
+                self.trial_running = False
+    
+    def retry_after(self, value: Optional[str]) -> Optional[float]:
+        """Retry-After header (seconds or HTTP date) -> seconds"""
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.max_delay)
+    
+    def outcome(self, attempt: int, status: Optional[int] = None,
+                retry_after: Optional[str] = None, error: Optional[Exception] = None) -> Optional[float]:
+        """Record an attempt's result; returns the delay before retrying, or None to stop"""
+        failed = error is not None or (status is not None and status >= 500 and status in RETRY_STATUSES)
+        throttled = status == 429
+        
+        with self.lock:
+            self.trial_running = False
+            if failed:
+                self.failures += 1
+                if self.opened_at is not None or self.failures >= self.breaker_threshold:
+                    self.opened_at = time.monotonic()
+                    print(f"  🚧 {self.name}: circuit open after {self.failures} failures "
+                          f"(cooling down {self.breaker_cooldown:g}s)")
+            elif not throttled:
+                self.failures = 0
+                self.opened_at = None
+            
+            if not (failed or throttled) or attempt >= self.max_retries:
+                return None
+            
+            delay = self.retry_after(retry_after)
+            if delay is None:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            if throttled:
+                # Everyone sharing this upstream backs off, not just this caller
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.retries += 1
+        
+        reason = status or type(error).__name__
+        print(f"  🔁 {self.name} {reason}: retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+    
+    def run(self, send: Callable[[int], Any], transport_errors: tuple = ()):
+        """Call send(attempt) until it returns a non-retryable response (blocking)"""
+        for attempt in count():
+            wait, trial = self.reserve()
+            try:
+                time.sleep(wait)
+                resp = send(attempt)
+            except transport_errors as e:
+                delay = self.outcome(attempt, error=e)
+                if delay is None:
+                    raise
+            except BaseException:
+                self.abandon(trial)
+                raise
+            else:
+                delay = self.outcome(attempt, resp.status_code, resp.headers.get('Retry-After'))
+                if delay is None:
+                    return resp
+            time.sleep(delay)
+    
+    async def arun(self, send: Callable[[int], Any], transport_errors: tuple = ()):
+        """Await send(attempt) until it returns a non-retryable response"""
+        for attempt in count():
+            wait, trial = self.reserve()
+            try:
+                await asyncio.sleep(wait)
+                resp = await send(attempt)
+            except transport_errors as e:
+                delay = self.outcome(attempt, error=e)
+                if delay is None:
+                    raise
+            except BaseException:
+                self.abandon(trial)
+                raise
+            else:
+                delay = self.outcome(attempt, resp.status_code, resp.headers.get('Retry-After'))
+                if delay is None:
+                    return resp
+            await asyncio.sleep(delay)
+
+
 class SupabaseClient:
-    """Simple Supabase client for data operations"""
+    """Simple Supabase client for data operations
+
+    All requests share one keep-alive session, so a sync run reuses a small,
+    bounded pool of TCP/TLS connections instead of opening one per row.
+    """
     
-    def __init__(self, url: str, key: str):
+    def __init__(self, url: str, key: str, pool_size: int = SUPABASE_POOL_SIZE,
+                 connect_timeout: float = SUPABASE_CONNECT_TIMEOUT,
+                 read_timeout: float = SUPABASE_READ_TIMEOUT,
+                 scheduler: Optional[RequestScheduler] = None):
         self.url = url.rstrip('/')
         self.key = key
+        self.metrics: Optional[SyncMetrics] = None
+        self.scheduler = scheduler or RequestScheduler('supabase', SUPABASE_RATE_LIMIT_RPS)
         self.headers = {
             'apikey': key,
             'Authorization': f'Bearer {key}',
             'Content-Type': 'application/json',
             'Prefer': 'return=representation'
         }
+        self.timeout = (connect_timeout, read_timeout)
+        
+        # pool_block keeps the pool bounded: extra threads wait for a free
+        # connection instead of opening throwaway ones
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
     
-    def _request(self, method: str, table: str, data: Optional[Dict] = None, params: Optional[Dict] = None):
+    def _request(self, method: str, table: str, data: Optional[Dict | List[Dict]] = None,
+                 params: Optional[Dict] = None, headers: Optional[Dict] = None):
         """Make request to Supabase"""
         url = f"{self.url}/rest/v1/{table}"
         
+        if method not in ('GET', 'POST', 'PATCH'):
+            raise ValueError(f"Unsupported method: {method}")
+        
+        def send(attempt: int) -> requests.Response:
+            started = time.perf_counter()
+            resp = None
+            try:
+                resp = self.session.request(
+                    method,
+                    url,
+                    json=data,
+                    params=params,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                return resp
+            finally:
+                if self.metrics:
+                    self.metrics.observe_request(
+                        'supabase', f"{method} {table}", time.perf_counter() - started,
+                        resp.status_code if resp is not None else None,
+                        bytes_sent=body_size(resp.request.body) if resp is not None else 0,
+                        bytes_received=len(resp.content) if resp is not None else 0,
+                        retries=1 if attempt else 0
+                    )
+        
         try:
-            if method == 'GET':
-                resp = requests.get(url, headers=self.headers, params=params)
-            elif method == 'POST':
-                resp = requests.post(url, headers=self.headers, json=data)
-            elif method == 'PATCH':
-                resp = requests.patch(url, headers=self.headers, json=data, params=params)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
+            resp = self.scheduler.run(send, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
             resp.raise_for_status()
             return resp.json() if resp.text else None
         except requests.exceptions.RequestException as e:
@@ -81,23 +794,1008 @@ class SupabaseClient:
                 print(f"Response: {e.response.text}")
             raise
     
-    def insert(self, table: str, data: Dict | List[Dict]):
+    def insert(self, table: str, data: Dict | List[Dict], returning: str = 'representation'):
         """Insert data into table"""
-        return self._request('POST', table, data=data)
+        headers = {'Prefer': f'return={returning}'}
+        return self._request('POST', table, data=data, headers=headers)
     
     def select(self, table: str, params: Optional[Dict] = None):
         """Select data from table"""
         return self._request('GET', table, params=params)
     
-    def upsert(self, table: str, data: Dict | List[Dict], on_conflict: str = ''):
+    def iter_select(self, table: str, keys: tuple, columns: Optional[List[str]] = None,
+                    params: Optional[Dict] = None, page_size: int = 1000):
+        """Yield every matching row in `keys` order, one keyset page at a time
+
+        Use an indexed column (`timestamp`, `date`) followed by a unique one
+        (`id`) as keys. Each page asks for the rows after the last one seen
+        rather than an offset, so only one page is held in memory and deep
+        pages cost the same as the first. params can't carry their own `or`.
+        Only an empty page ends the scan: PostgREST silently caps a page at
+        its max-rows setting, so a short page doesn't mean the last one.
+        """
+        query = keyset_query(keys, columns, params, page_size)
+        while True:
+            page = self.select(table, query) or []
+            if not page:
+                return
+            yield from page
+            query['or'] = keyset_filter(keys, page[-1])
+    
+    def upsert(self, table: str, data: Dict | List[Dict], on_conflict: str = '',
+               returning: str = 'representation', ignore_duplicates: bool = False):
         """Upsert data (insert or update on conflict)"""
-        headers = self.headers.copy()
-        headers['Prefer'] = f'resolution=merge-duplicates,return=representation'
+        resolution = 'ignore-duplicates' if ignore_duplicates else 'merge-duplicates'
+        headers = {'Prefer': f'resolution={resolution},return={returning}'}
+        params = {'on_conflict': on_conflict} if on_conflict else None
+        return self._request('POST', table, data=data, params=params, headers=headers)
+    
+    def patch(self, table: str, data: Dict, params: Dict):
+        """Update rows matching the filter params"""
+        return self._request('PATCH', table, data=data, params=params)
+    
+    def connection_stats(self) -> Dict[str, int]:
+        """Requests sent vs. connections opened across the pool"""
+        requests_sent = 0
+        connections_opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
         
+        return {
+            'requests': requests_sent,
+            'connections': connections_opened,
+            'reused': max(requests_sent - connections_opened, 0)
+        }
+    
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+
+class AsyncSupabaseClient:
+    """asyncio Supabase client with the same surface as SupabaseClient
+
+    One pooled httpx.AsyncClient serves every request, so DB writes run on
+    the event loop alongside the Fi fetches instead of blocking it. HTTP/2 is
+    used when h2 is installed and the server offers it; concurrent requests
+    then share a single multiplexed connection.
+    """
+    
+    def __init__(self, url: str, key: str, pool_size: int = SUPABASE_POOL_SIZE,
+                 connect_timeout: float = SUPABASE_CONNECT_TIMEOUT,
+                 read_timeout: float = SUPABASE_READ_TIMEOUT,
+                 scheduler: Optional[RequestScheduler] = None):
+        self.url = url.rstrip('/')
+        self.key = key
+        self.metrics: Optional[SyncMetrics] = None
+        self.scheduler = scheduler or RequestScheduler('supabase', SUPABASE_RATE_LIMIT_RPS)
+        self.headers = {
+            'apikey': key,
+            'Authorization': f'Bearer {key}',
+            'Content-Type': 'application/json',
+            'Prefer': 'return=representation'
+        }
+        
+        # Requests beyond pool_size wait for a free connection (up to read_timeout)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self.http_versions: set = set()
+    
+    async def _trace(self, event: str, info: Dict):
+        """httpcore trace hook; counts new TCP connections"""
+        if event == 'connection.connect_tcp.complete':
+            self.connections_opened += 1
+    
+    async def _request(self, method: str, table: str, data: Optional[Dict | List[Dict]] = None,
+                       params: Optional[Dict] = None, headers: Optional[Dict] = None):
+        """Make request to Supabase"""
         url = f"{self.url}/rest/v1/{table}"
-        resp = requests.post(url, headers=headers, json=data)
-        resp.raise_for_status()
-        return resp.json() if resp.text else None
+        
+        if method not in ('GET', 'POST', 'PATCH', 'DELETE'):
+            raise ValueError(f"Unsupported method: {method}")
+        
+        async def send(attempt: int) -> httpx.Response:
+            started = time.perf_counter()
+            resp = None
+            try:
+                resp = await self.client.request(
+                    method,
+                    url,
+                    json=data,
+                    params=params,
+                    headers=headers,
+                    extensions={'trace': self._trace}
+                )
+                self.requests_sent += 1
+                self.http_versions.add(resp.http_version)
+                return resp
+            finally:
+                if self.metrics:
+                    self.metrics.observe_request(
+                        'supabase', f"{method} {table}", time.perf_counter() - started,
+                        resp.status_code if resp is not None else None,
+                        bytes_sent=len(resp.request.content) if resp is not None else 0,
+                        bytes_received=len(resp.content) if resp is not None else 0,
+                        retries=1 if attempt else 0
+                    )
+        
+        try:
+            resp = await self.scheduler.arun(send, (httpx.TransportError,))
+            resp.raise_for_status()
+            return resp.json() if resp.content else None
+        except httpx.HTTPError as e:
+            print(f"Supabase request error: {e}")
+            if isinstance(e, httpx.HTTPStatusError):
+                print(f"Response: {e.response.text}")
+            raise
+    
+    async def insert(self, table: str, data: Dict | List[Dict], returning: str = 'representation'):
+        """Insert data into table"""
+        headers = {'Prefer': f'return={returning}'}
+        return await self._request('POST', table, data=data, headers=headers)
+    
+    async def select(self, table: str, params: Optional[Dict] = None):
+        """Select data from table"""
+        return await self._request('GET', table, params=params)
+    
+    async def iter_select(self, table: str, keys: tuple, columns: Optional[List[str]] = None,
+                          params: Optional[Dict] = None, page_size: int = 1000):
+        """Async twin of SupabaseClient.iter_select"""
+        query = keyset_query(keys, columns, params, page_size)
+        while True:
+            page = await self.select(table, query) or []
+            if not page:
+                return
+            for row in page:
+                yield row
+            query['or'] = keyset_filter(keys, page[-1])
+    
+    async def upsert(self, table: str, data: Dict | List[Dict], on_conflict: str = '',
+                     returning: str = 'representation', ignore_duplicates: bool = False):
+        """Upsert data (insert or update on conflict)"""
+        resolution = 'ignore-duplicates' if ignore_duplicates else 'merge-duplicates'
+        headers = {'Prefer': f'resolution={resolution},return={returning}'}
+        params = {'on_conflict': on_conflict} if on_conflict else None
+        return await self._request('POST', table, data=data, params=params, headers=headers)
+    
+    async def patch(self, table: str, data: Dict, params: Dict):
+        """Update rows matching the filter params"""
+        return await self._request('PATCH', table, data=data, params=params)
+    
+    async def delete(self, table: str, params: Dict):
+        """Delete rows matching the filter params"""
+        return await self._request('DELETE', table, params=params)
+    
+    def connection_stats(self) -> Dict[str, Any]:
+        """Requests sent vs. connections opened, same shape as SupabaseClient's"""
+        return {
+            'requests': self.requests_sent,
+            'connections': self.connections_opened,
+            'reused': max(self.requests_sent - self.connections_opened, 0),
+            'http_versions': sorted(self.http_versions)
+        }
+    
+    async def close(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+
+
+class WriteSpool:
+    """Durable local queue of outgoing rows (SQLite in WAL mode)
+
+    Rows are appended before they are sent and deleted once Supabase has
+    accepted them, so rows from a failed or interrupted write survive until
+    a later run replays them. WAL mode keeps appends cheap and lets
+    several sync processes share one spool file.
+    
+    Rows Supabase rejects outright, or that still fail after
+    SPOOL_MAX_ATTEMPTS runs, move to a dead_letter table so they stop
+    holding up the queue; they stay there for inspection.
+    
+    It also remembers a content hash per upserted row that Supabase has
+    accepted, so a resync can skip rows that haven't changed.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tbl TEXT NOT NULL,
+                on_conflict TEXT NOT NULL DEFAULT '',
+                ignore_duplicates INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL,
+                queued_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                seq INTEGER PRIMARY KEY,
+                tbl TEXT NOT NULL,
+                on_conflict TEXT NOT NULL DEFAULT '',
+                ignore_duplicates INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL,
+                queued_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                failed_at TEXT NOT NULL
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS row_hashes (
+                tbl TEXT NOT NULL,
+                row_key TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (tbl, row_key)
+            ) WITHOUT ROWID
+        """)
+    
+    def append(self, table: str, rows: List[Dict], on_conflict: str = '',
+               ignore_duplicates: bool = False) -> List[int]:
+        """Spool rows in one transaction; returns their sequence numbers"""
+        now = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                seqs = [
+                    self.db.execute(
+                        'INSERT INTO spool (tbl, on_conflict, ignore_duplicates, payload, queued_at) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (table, on_conflict, int(ignore_duplicates), json.dumps(row), now)
+                    ).lastrowid
+                    for row in rows
+                ]
+                self.db.execute('COMMIT')
+            except Exception:
+                self.db.execute('ROLLBACK')
+                raise
+        return seqs
+    
+    def pending(self) -> List[Dict[str, Any]]:
+        """Every row still waiting to be written, oldest first"""
+        with self.lock:
+            cursor = self.db.execute(
+                'SELECT seq, tbl, on_conflict, ignore_duplicates, payload FROM spool ORDER BY seq'
+            )
+            return [
+                {'seq': seq, 'table': table, 'on_conflict': on_conflict,
+                 'ignore_duplicates': bool(ignore), 'row': json.loads(payload)}
+                for seq, table, on_conflict, ignore, payload in cursor
+            ]
+    
+    def count(self) -> int:
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+    
+    def ack(self, seqs: List[int]):
+        """Drop rows Supabase has accepted"""
+        with self.lock:
+            for chunk in iter_chunks(seqs, 500):
+                marks = ','.join('?' * len(chunk))
+                self.db.execute(f'DELETE FROM spool WHERE seq IN ({marks})', chunk)
+    
+    def fail(self, seqs: List[int], error: str, rejected: bool = False) -> set:
+        """Note why rows weren't written; returns the seqs moved to dead_letter
+
+        Rows keep their place for the next run unless Supabase rejected them
+        (rejected) or this was their SPOOL_MAX_ATTEMPTS-th failure.
+        """
+        moved = set()
+        now = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            for chunk in iter_chunks(seqs, 500):
+                marks = ','.join('?' * len(chunk))
+                self.db.execute('BEGIN IMMEDIATE')
+                try:
+                    self.db.execute(
+                        f'UPDATE spool SET attempts = attempts + 1, last_error = ? WHERE seq IN ({marks})',
+                        [error[:500]] + chunk
+                    )
+                    dead = [seq for (seq,) in self.db.execute(
+                        f'SELECT seq FROM spool WHERE seq IN ({marks}) AND (? OR attempts >= ?)',
+                        chunk + [int(rejected), SPOOL_MAX_ATTEMPTS]
+                    )]
+                    if dead:
+                        dead_marks = ','.join('?' * len(dead))
+                        self.db.execute(
+                            'INSERT OR REPLACE INTO dead_letter SELECT seq, tbl, on_conflict, ignore_duplicates, '
+                            f'payload, queued_at, attempts, last_error, ? FROM spool WHERE seq IN ({dead_marks})',
+                            [now] + dead
+                        )
+                        self.db.execute(f'DELETE FROM spool WHERE seq IN ({dead_marks})', dead)
+                    self.db.execute('COMMIT')
+                except Exception:
+                    self.db.execute('ROLLBACK')
+                    raise
+                moved.update(dead)
+        return moved
+    
+    def hashes(self, table: str, keys: List[str]) -> Dict[str, str]:
+        """Content hashes of the last accepted version of these rows, by row key"""
+        found = {}
+        with self.lock:
+            for chunk in iter_chunks(keys, 500):
+                marks = ','.join('?' * len(chunk))
+                found.update(self.db.execute(
+                    f'SELECT row_key, hash FROM row_hashes WHERE tbl = ? AND row_key IN ({marks})',
+                    [table] + chunk
+                ))
+        return found
+    
+    def remember(self, table: str, hashes: List[tuple]):
+        """Record (row key, hash) pairs for rows Supabase accepted"""
+        with self.lock:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO row_hashes (tbl, row_key, hash) VALUES (?, ?, ?)',
+                [(table, key, digest) for key, digest in hashes]
+            )
+    
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class WriteBuffer:
+    """Collects rows per table and flushes them as chunked bulk POSTs
+
+    Rows written with an on_conflict key are de-duplicated in the buffer
+    (last one wins), since PostgREST rejects a bulk upsert that touches the
+    same row twice. Rows are queued from the fetch thread and drained on
+    the event loop, so all access goes through a lock.
+    
+    With a spool, every row is made durable there first; a chunk's rows
+    are removed from the spool only after Supabase accepted them. Upserted
+    rows whose content hash matches the last accepted version are dropped
+    before that (change detection), and counted per table.
+    """
+    
+    def __init__(self, supabase: AsyncSupabaseClient, chunk_size: int = BATCH_SIZE,
+                 spool: Optional[WriteSpool] = None):
+        self.supabase = supabase
+        self.chunk_size = max(chunk_size, 1)
+        self.spool = spool
+        # table -> conflict key -> (row, spool seqs it replaces, (row key, hash) or None)
+        self.rows: Dict[str, Dict[Any, tuple]] = {}
+        self.on_conflict: Dict[str, str] = {}
+        self.ignore_duplicates: Dict[str, bool] = {}
+        self.chunks_written: Dict[str, int] = {}
+        self.sequence = 0
+        self.detect_changes = True
+        # table -> {'changed': rows queued, 'unchanged': rows skipped}
+        self.changes: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+    
+    def add(self, table: str, row: Dict, on_conflict: str = '', ignore_duplicates: bool = False) -> bool:
+        """Queue a row; on_conflict switches the table to upsert mode
+
+        Returns False if the row was skipped as unchanged.
+        """
+        return self.add_many(table, [row], on_conflict, ignore_duplicates) > 0
+    
+    def add_many(self, table: str, rows: List[Dict], on_conflict: str = '',
+                 ignore_duplicates: bool = False, seqs: Optional[List[int]] = None) -> int:
+        """Queue rows for one table; seqs marks rows already in the spool (replay)
+
+        Returns how many rows were queued.
+        """
+        hashes: List[Optional[tuple]] = [None] * len(rows)
+        if seqs is None:
+            # Insert-only tables (ignore_duplicates) don't rewrite rows, so there's nothing to skip
+            if self.spool and on_conflict and not ignore_duplicates:
+                rows, hashes = self.changed_rows(table, rows, on_conflict)
+            seqs = self.spool.append(table, rows, on_conflict, ignore_duplicates) if self.spool else [None] * len(rows)
+        
+        with self.lock:
+            pending = self.rows.setdefault(table, {})
+            self.on_conflict.setdefault(table, on_conflict)
+            self.ignore_duplicates.setdefault(table, ignore_duplicates)
+            for row, seq, digest in zip(rows, seqs, hashes):
+                key = tuple(row.get(col) for col in on_conflict.split(',')) if on_conflict else ()
+                if not key or None in key:
+                    # Rows without a conflict key never collide; keep each one
+                    self.sequence += 1
+                    key = ('row', self.sequence)
+                _, replaced, _ = pending.get(key, (None, [], None))
+                pending[key] = (row, replaced + [seq] if seq is not None else replaced, digest)
+        return len(rows)
+    
+    def changed_rows(self, table: str, rows: List[Dict], on_conflict: str) -> tuple:
+        """Drop rows identical to their last accepted version; returns (rows, (row key, hash)s)
+
+        With detect_changes off every row is kept, but the hashes are still
+        recorded once written, so the next run compares against fresh ones.
+        """
+        columns = on_conflict.split(',')
+        keyed = [(json.dumps([row.get(col) for col in columns], default=str), row_hash(row)) for row in rows]
+        stored = self.spool.hashes(table, [key for key, _ in keyed]) if self.detect_changes else {}
+        changed = [(row, pair) for row, pair in zip(rows, keyed) if stored.get(pair[0]) != pair[1]]
+        
+        with self.lock:
+            counts = self.changes.setdefault(table, {'changed': 0, 'unchanged': 0})
+            counts['changed'] += len(changed)
+            counts['unchanged'] += len(rows) - len(changed)
+        return [row for row, _ in changed], [pair for _, pair in changed]
+    
+    def pending(self, table: Optional[str] = None) -> int:
+        """Number of rows waiting to be flushed"""
+        with self.lock:
+            if table:
+                return len(self.rows.get(table, {}))
+            return sum(len(rows) for rows in self.rows.values())
+    
+    def drain(self, table: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Take buffered rows out as chunk jobs"""
+        jobs = []
+        
+        with self.lock:
+            tables = [table] if table else list(self.rows.keys())
+            for name in tables:
+                pending = self.rows.get(name, {})
+                keys = list(pending.keys())
+                for i in range(0, len(keys), self.chunk_size):
+                    entries = [pending.pop(key) for key in keys[i:i + self.chunk_size]]
+                    self.chunks_written[name] = self.chunks_written.get(name, 0) + 1
+                    jobs.append({
+                        'table': name,
+                        'on_conflict': self.on_conflict.get(name, ''),
+                        'ignore_duplicates': self.ignore_duplicates.get(name, False),
+                        'chunk': self.chunks_written[name],
+                        'rows': [row for row, _, _ in entries],
+                        'row_seqs': [seqs for _, seqs, _ in entries],
+                        'row_hashes': [digest for _, _, digest in entries]
+                    })
+        
+        return jobs
+    
+    @staticmethod
+    def rejected(error: Exception) -> bool:
+        """Whether Supabase refused the rows themselves, so sending them again can't help
+
+        Auth and missing-table errors (401/403/404) are fixed by configuration
+        and count as retryable, like 408, 429, 5xx and transport errors.
+        """
+        if not isinstance(error, httpx.HTTPStatusError):
+            return False
+        status = error.response.status_code
+        return 400 <= status < 500 and status not in (401, 403, 404, 408, 429)
+    
+    async def send_rows(self, job: Dict[str, Any], indexes: List[int]) -> Optional[Exception]:
+        """POST some of a chunk's rows; returns the error, or None once they are acked"""
+        name, on_conflict = job['table'], job['on_conflict']
+        rows = [job['rows'][i] for i in indexes]
+        try:
+            if on_conflict:
+                await self.supabase.upsert(name, rows, on_conflict=on_conflict, returning='minimal',
+                                           ignore_duplicates=job.get('ignore_duplicates', False))
+            else:
+                await self.supabase.insert(name, rows, returning='minimal')
+        except Exception as e:
+            return e
+        
+        if self.spool:
+            seqs = [seq for i in indexes for seq in job['row_seqs'][i]]
+            if seqs:
+                self.spool.ack(seqs)
+            hashes = [job['row_hashes'][i] for i in indexes if job['row_hashes'][i]]
+            if hashes:
+                self.spool.remember(name, hashes)
+        return None
+    
+    async def write_rows(self, job: Dict[str, Any], indexes: List[int],
+                         error: Optional[Exception] = None) -> tuple:
+        """Send rows by index; returns (indexes not written, error)
+
+        A rejected batch is split in halves to isolate the rows at fault for
+        as long as only one half keeps failing. When both halves are rejected
+        the cause is the batch as a whole (say a column the table lacks), and
+        splitting further would only multiply requests.
+        """
+        if error is None:
+            error = await self.send_rows(job, indexes)
+        if error is None or not self.rejected(error) or len(indexes) == 1:
+            return (indexes if error else []), error
+        
+        halves = (indexes[:len(indexes) // 2], indexes[len(indexes) // 2:])
+        errors = [await self.send_rows(job, half) for half in halves]
+        if all(errors):
+            return indexes, errors[0]
+        half, half_error = next((half, e) for half, e in zip(halves, errors) if e)
+        return await self.write_rows(job, half, half_error)
+    
+    async def write(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one chunk job to Supabase; returns its result
+
+        `written` rows were accepted, `kept` stay spooled for the next run and
+        `dead` went to the spool's dead-letter table.
+        """
+        name, rows = job['table'], job['rows']
+        result = {'table': name, 'chunk': job['chunk'], 'rows': len(rows), 'kept': 0, 'dead': 0}
+        
+        failed, error = await self.write_rows(job, list(range(len(rows))))
+        result['written'] = len(rows) - len(failed)
+        result['ok'] = not failed
+        if not failed:
+            print(f"  📦 {name} chunk {job['chunk']}: {len(rows)} rows written")
+            return result
+        
+        result['error'] = str(error)
+        result['failed_rows'] = [rows[i] for i in failed]
+        seqs = [seq for i in failed for seq in job['row_seqs'][i]]
+        if self.spool and seqs:
+            moved = self.spool.fail(seqs, str(error), rejected=self.rejected(error))
+            result['dead'] = sum(1 for i in failed if job['row_seqs'][i] and set(job['row_seqs'][i]) <= moved)
+            result['kept'] = len(failed) - result['dead']
+        print(f"  ❌ {name} chunk {job['chunk']}: {len(failed)} of {len(rows)} rows failed: {error}")
+        if result['dead']:
+            print(f"  🪦 {result['dead']} of them moved to the spool's dead_letter table")
+        
+        return result
+    
+    async def flush(self, table: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Write all buffered rows in chunks; returns one result per chunk"""
+        return [await self.write(job) for job in self.drain(table)]
+
+
+# Cursor-paged history feeds, by alias: (field, items key, item fields). Each
+# page holds up to `limit` items after `cursor`, newest first; a null cursor
+# means there is nothing older. currentActivitySummary only covers the
+# current day/week/month, so days before that come from these.
+FI_FEEDS = {
+    'monthFeed': ('activitySummaryFeed(cursor: %(cursor)s, period: MONTHLY, limit: %(limit)d)',
+                  'activitySummaries', 'start end dailySteps { date totalSteps stepGoal }'),
+    'restFeed': ('restSummaryFeed(cursor: %(cursor)s, period: DAILY, limit: %(limit)d)',
+                 'restSummaries',
+                 'start end data { ... on ConcreteRestSummaryData { sleepAmounts { type duration } } }'),
+    'walkFeed': ('activityFeed(cursor: %(cursor)s, limit: %(limit)d)', 'activities',
+                 '__typename ... on Walk { start end areaName totalSteps distance '
+                 'positions { date errorRadius position { latitude longitude } } }')
+}
+FEED_STREAMS = {'monthFeed': 'activity', 'restFeed': 'sleep', 'walkFeed': 'walks'}
+FI_WALK_PAGE = 25  # Minimum activities per walkFeed page; 4 per day of window beyond that
+
+# Everything a sync reads, in one aliased query: the route's ActivitySummaryDetails,
+# RestSummaryDetails, OngoingActivityDetails and device details cut down to the
+# fields we store or publish in the snapshot, plus the first page of each feed
+FI_SYNC_QUERY = """
+query { pet(id: "%(pet_id)s") {
+  name weight breed { name } photos { first { image { fullSize } } }
+  dailyStat: currentActivitySummary(period: DAILY) { start totalSteps stepGoal totalDistance }
+  weeklyStat: currentActivitySummary(period: WEEKLY) { totalSteps totalDistance }
+  %(feeds)s
+  ongoing: ongoingActivity {
+    __typename start areaName lastReportTimestamp totalSteps
+    ... on OngoingWalk { distance positions { date errorRadius position { latitude longitude } } }
+    ... on OngoingRest { position { latitude longitude } place { name address } }
+  }
+  device {
+    lastConnectionState { __typename date ... on ConnectedToCellular { signalStrengthPercent } }
+    ledColor { name hexCode }
+  }
+} }
+"""
+
+# A further page of one feed, for windows reaching past the first page
+FI_FEED_PAGE_QUERY = 'query { pet(id: "%(pet_id)s") { %(feed)s } }'
+
+
+def feed_field(alias: str, cursor: Optional[str], limit: int) -> str:
+    """One FI_FEEDS entry as an aliased GraphQL selection"""
+    field, items_key, item_fields = FI_FEEDS[alias]
+    args = {'cursor': json.dumps(cursor), 'limit': max(limit, 1)}
+    return f"{alias}: {field % args} {{ cursor {items_key} {{ {item_fields} }} }}"
+
+
+FI_PETS_QUERY = """
+query { currentUser { __typename userHouseholds { __typename household { __typename pets { __typename id name } } } } }
+"""
+
+# Fi rest summary types -> bailey_fi_sleep.sleep_type
+FI_SLEEP_TYPES = {'SLEEP': 'rest', 'NAP': 'nap'}
+
+
+class FiAuthError(Exception):
+    """Fi rejected the login or the session cookie"""
+
+
+class FiSession:
+    """Cookie-authenticated Fi API session, cached on disk between runs
+
+    The session cookie and resolved pet are stored in FI_SESSION_CACHE
+    (mode 0600) until they expire, so most runs skip the login and pet
+    lookup. A request that fails with an auth error logs in again once.
+    """
+    
+    def __init__(self, email: str, password: str, cache_path: str = FI_SESSION_CACHE,
+                 ttl_hours: float = FI_SESSION_TTL_HOURS):
+        self.email = email
+        self.password = password
+        self.cache_path = cache_path
+        self.ttl = timedelta(hours=ttl_hours)
+        self.session = requests.Session()
+        self.timeout = (SUPABASE_CONNECT_TIMEOUT, SUPABASE_READ_TIMEOUT)
+        self.expires_at: Optional[datetime] = None
+        self.pet_id: Optional[str] = FI_PET_ID
+        self.pet_name: Optional[str] = None
+        self.logins = 0
+        self.metrics: Optional[SyncMetrics] = None
+        self.scheduler = RequestScheduler('fi', FI_RATE_LIMIT_RPS)
+    
+    def post(self, endpoint: str, retries: int = 0, **kwargs) -> requests.Response:
+        """POST to the Fi API through the scheduler, reporting each attempt to the metrics"""
+        def send(attempt: int) -> requests.Response:
+            started = time.perf_counter()
+            resp = None
+            try:
+                resp = self.session.post(f"{FI_API_BASE}{endpoint}", timeout=self.timeout, **kwargs)
+                return resp
+            finally:
+                if self.metrics:
+                    self.metrics.observe_request(
+                        'fi', endpoint, time.perf_counter() - started,
+                        resp.status_code if resp is not None else None,
+                        bytes_sent=body_size(resp.request.body) if resp is not None else 0,
+                        bytes_received=len(resp.content) if resp is not None else 0,
+                        retries=retries + (1 if attempt else 0)
+                    )
+        
+        return self.scheduler.run(send, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+    
+    def load_cache(self) -> bool:
+        """Restore a cached session; False if missing, expired or unreadable"""
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        expires_at = parse_timestamp(cached.get('expires_at'))
+        if cached.get('email') != self.email or not expires_at or expires_at <= datetime.now(timezone.utc):
+            return False
+        
+        self.session.cookies.update(cached.get('cookies', {}))
+        self.expires_at = expires_at
+        self.pet_id = self.pet_id or cached.get('pet_id')
+        self.pet_name = cached.get('pet_name')
+        return True
+    
+    def save_cache(self):
+        """Write the session to the cache file, readable by this user only"""
+        cached = {
+            'email': self.email,
+            'cookies': requests.utils.dict_from_cookiejar(self.session.cookies),
+            'pet_id': self.pet_id,
+            'pet_name': self.pet_name,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+        
+        # Per-process temp file: a cron run and the daemon may refresh the cache together
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cached, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.cache_path)
+    
+    def login(self):
+        """Log in with email/password and cache the new session"""
+        print("🔑 Logging in to Fi...")
+        self.session.cookies.clear()
+        resp = self.post('/auth/login', data={'email': self.email, 'password': self.password})
+        body = self.json_body(resp)
+        if not resp.ok or body.get('error'):
+            message = (body.get('error') or {}).get('message', resp.status_code)
+            raise FiAuthError(f"Fi login failed: {message}")
+        
+        # Fall back to the session id when Fi doesn't set a cookie
+        if not self.session.cookies and body.get('sessionId'):
+            self.session.cookies.set('fi.sid', body['sessionId'])
+        
+        self.logins += 1
+        self.expires_at = datetime.now(timezone.utc) + self.ttl
+        self.save_cache()
+    
+    def connect(self):
+        """Reuse the cached session, or log in"""
+        if self.load_cache():
+            print(f"♻️  Reusing cached Fi session (expires {self.expires_at:%Y-%m-%d %H:%M} UTC)")
+        else:
+            self.login()
+    
+    @staticmethod
+    def json_body(resp: requests.Response) -> Dict:
+        """Decoded JSON body; {} for empty or non-JSON (e.g. gateway error) pages"""
+        try:
+            body = resp.json() if resp.text else {}
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+    
+    @staticmethod
+    def is_auth_error(resp: requests.Response, body: Dict) -> bool:
+        if resp.status_code in (401, 403):
+            return True
+        messages = ' '.join(str(err.get('message', '')) for err in body.get('errors') or [])
+        return 'auth' in messages.lower() or 'logged in' in messages.lower()
+    
+    def query(self, query: str) -> Dict[str, Any]:
+        """Run a GraphQL query, logging in again once on an auth error"""
+        for attempt in (1, 2):
+            resp = self.post('/graphql', retries=attempt - 1, json={'query': query})
+            body = self.json_body(resp)
+            
+            if self.is_auth_error(resp, body):
+                if attempt == 2:
+                    raise FiAuthError("Fi rejected a freshly issued session")
+                print("🔑 Fi session expired")
+                self.login()
+                continue
+            
+            resp.raise_for_status()
+            if body.get('errors') and not body.get('data'):
+                raise ValueError(f"Fi GraphQL error: {body['errors'][0].get('message')}")
+            return body.get('data') or {}
+        
+        return {}
+    
+    def resolve_pet(self) -> tuple:
+        """Find the pet to sync (cached, FI_PET_ID, or looked up by name)"""
+        if self.pet_id:
+            return self.pet_id, self.pet_name or FI_PET_NAME
+        
+        data = self.query(FI_PETS_QUERY)
+        pets = [
+            pet
+            for household in (data.get('currentUser') or {}).get('userHouseholds') or []
+            for pet in (household.get('household') or {}).get('pets') or []
+        ]
+        if not pets:
+            raise ValueError("No pets found in Fi account")
+        
+        pet = next((p for p in pets if p.get('name', '').lower() == FI_PET_NAME.lower()), pets[0])
+        self.pet_id, self.pet_name = pet['id'], pet.get('name')
+        self.save_cache()
+        return self.pet_id, self.pet_name
+    
+    def close(self):
+        """Close HTTP connections; the cached session stays valid"""
+        self.session.close()
+
+
+class FiPet:
+    """Fi data for one pet, keyed by date the way the sync_* methods read it
+
+    One FI_SYNC_QUERY round trip, made on first access (once per run),
+    carries the current stats and the first page of each history feed.
+    A feed is paged further back only when the window reaches past its
+    first page, as long windows and backfills do.
+    """
+    
+    def __init__(self, session: FiSession, pet_id: str, name: str):
+        self.fi = session
+        self.id = pet_id
+        self.name = name
+        # Oldest day the feeds must reach; set before the first feed is read
+        self.start = (datetime.now() - timedelta(days=DAYS_TO_SYNC)).date()
+        self._feeds: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.fetched_at: Optional[datetime] = None
+        # alias -> oldest day a feed has, when it ran out before reaching `start`
+        self.history_starts: Dict[str, Optional[Any]] = {}
+    
+    def _feed(self, name: str, loader):
+        with self._lock:
+            if name not in self._feeds:
+                self._feeds[name] = loader()
+            return self._feeds[name]
+    
+    def feed_limits(self) -> Dict[str, int]:
+        """First-page sizes that reach `start`: months and days back from today"""
+        today = datetime.now().date()
+        return {
+            'monthFeed': (today.year - self.start.year) * 12 + today.month - self.start.month + 1,
+            'restFeed': (today - self.start).days + 1,
+            'walkFeed': max(FI_WALK_PAGE, 4 * ((today - self.start).days + 1))
+        }
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        """The pet's raw GraphQL data; `start` must be final before the first feed is read"""
+        def load():
+            self.fetched_at = datetime.now(timezone.utc)
+            feeds = '\n  '.join(feed_field(alias, None, limit) for alias, limit in self.feed_limits().items())
+            return self.fi.query(FI_SYNC_QUERY % {'pet_id': self.id, 'feeds': feeds}).get('pet') or {}
+        return self._feed('snapshot', load)
+    
+    def _history(self, alias: str) -> List[Dict]:
+        """Every item of one feed back to `start`, following its cursor past the first page"""
+        _, items_key, _ = FI_FEEDS[alias]
+        start_at = datetime.combine(self.start, datetime.min.time()).astimezone()
+        page = self._snapshot().get(alias) or {}
+        items = list(page.get(items_key) or [])
+        cursor = page.get('cursor')
+        
+        def oldest() -> Optional[datetime]:
+            return parse_timestamp(items[-1].get('start')) if items else None
+        
+        while cursor and oldest() and oldest() > start_at:
+            query = FI_FEED_PAGE_QUERY % {'pet_id': self.id,
+                                          'feed': feed_field(alias, cursor, self.feed_limits()[alias])}
+            page = (self.fi.query(query).get('pet') or {}).get(alias) or {}
+            if not page.get(items_key):
+                break
+            items += page[items_key]
+            cursor = page.get('cursor')
+        
+        if not cursor and oldest() and oldest() > start_at:
+            self.history_starts[alias] = oldest().astimezone().date()
+        return items
+    
+    def snapshot_row(self) -> Dict[str, Any]:
+        """Current collar state as a bailey_fi_snapshot row (the fields /api/fi/sync serves)"""
+        pet = self._snapshot()
+        daily = pet.get('dailyStat') or {}
+        weekly = pet.get('weeklyStat') or {}
+        activity = pet.get('ongoing') or {}
+        place = activity.get('place') or {}
+        device = pet.get('device') or {}
+        connection = device.get('lastConnectionState') or {}
+        led = device.get('ledColor') or {}
+        photo = ((pet.get('photos') or {}).get('first') or {}).get('image') or {}
+        
+        # A rest reports where the pet is; a walk's last GPS point is the closest thing
+        position = activity.get('position') or {}
+        if not position and activity.get('positions'):
+            position = activity['positions'][-1].get('position') or {}
+        
+        return {
+            'pet_id': self.id,
+            'name': pet.get('name') or self.name,
+            'breed': (pet.get('breed') or {}).get('name'),
+            'weight': pet.get('weight'),
+            'photo_url': photo.get('fullSize'),
+            'steps': daily.get('totalSteps') or 0,
+            'daily_goal': daily.get('stepGoal'),
+            'distance_meters': daily.get('totalDistance') or 0,
+            'weekly_steps': weekly.get('totalSteps') or 0,
+            'weekly_distance_meters': weekly.get('totalDistance') or 0,
+            'activity_type': activity.get('__typename'),
+            'activity_start': activity.get('start'),
+            'activity_steps': activity.get('totalSteps') or 0,
+            'location': place.get('name') or place.get('address') or activity.get('areaName'),
+            'latitude': position.get('latitude'),
+            'longitude': position.get('longitude'),
+            'connection_type': connection.get('__typename'),
+            'connection_date': connection.get('date'),
+            'signal_strength_percent': connection.get('signalStrengthPercent'),
+            'led_color': led.get('name'),
+            'led_hex': led.get('hexCode'),
+            'source': 'sync',
+            'fetched_at': self.fetched_at.isoformat()
+        }
+    
+    @property
+    def daily_stats(self) -> Dict[str, Dict]:
+        return self._feed('activity', self._load_activity)
+    
+    @property
+    def walks(self) -> Dict[str, List[Dict]]:
+        return self._feed('walks', self._load_walks)
+    
+    @property
+    def sleep(self) -> Dict[str, List[Dict]]:
+        return self._feed('sleep', self._load_sleep)
+    
+    def _load_activity(self) -> Dict[str, Dict]:
+        pet = self._snapshot()
+        daily = pet.get('dailyStat') or {}
+        stats = {}
+        
+        for month in self._history('monthFeed'):
+            for day in month.get('dailySteps') or []:
+                date_str = str(day.get('date', ''))[:10]
+                stats[date_str] = {'step_count': day.get('totalSteps') or 0, 'goal': day.get('stepGoal') or 10000}
+        
+        if daily.get('start'):
+            today = parse_timestamp(daily['start']).astimezone().strftime('%Y-%m-%d')
+            stats.setdefault(today, {}).update({
+                'step_count': daily.get('totalSteps') or 0,
+                'goal': daily.get('stepGoal') or 10000,
+                'distance': daily.get('totalDistance') or 0
+            })
+        
+        # Rest/nap minutes come from the rest feed
+        for date_str, periods in self.sleep.items():
+            if date_str not in stats:
+                continue
+            day = stats[date_str]
+            for period in periods:
+                day[f"{period['type']}_minutes"] = period['duration'] // 60
+        
+        return stats
+    
+    def _load_sleep(self) -> Dict[str, List[Dict]]:
+        sleep: Dict[str, List[Dict]] = {}
+        
+        for summary in self._history('restFeed'):
+            if not summary.get('start'):
+                continue
+            date_str = parse_timestamp(summary['start']).astimezone().strftime('%Y-%m-%d')
+            for amount in (summary.get('data') or {}).get('sleepAmounts') or []:
+                if amount.get('type') not in FI_SLEEP_TYPES or not amount.get('duration'):
+                    continue
+                sleep.setdefault(date_str, []).append({
+                    'type': FI_SLEEP_TYPES[amount['type']],
+                    'start_time': summary['start'],
+                    'end_time': summary.get('end') or summary['start'],
+                    'duration': int(amount['duration'])
+                })
+        
+        return sleep
+    
+    @staticmethod
+    def walk_id(start: datetime) -> str:
+        """fi_walk_id for a walk: its start time, the one thing both feeds agree on
+
+        The ongoing walk has no id of its own, so the finished walk from the
+        activity feed must land on the same row to replace it.
+        """
+        return f"walk-{start.astimezone(timezone.utc).isoformat()}"
+    
+    def _load_walks(self) -> Dict[str, List[Dict]]:
+        walks: Dict[str, Dict] = {}
+        
+        activity = self._snapshot().get('ongoing') or {}
+        if activity.get('__typename') == 'OngoingWalk' and activity.get('start'):
+            start = parse_timestamp(activity['start'])
+            last_report = parse_timestamp(activity.get('lastReportTimestamp')) or datetime.now(timezone.utc)
+            walks[self.walk_id(start)] = {
+                'id': self.walk_id(start),
+                'start_time': start.isoformat(),
+                'end_time': last_report.isoformat(),
+                'duration': int((last_report - start).total_seconds()),
+                'steps': activity.get('totalSteps') or 0,
+                'distance': activity.get('distance') or 0,
+                'location': activity.get('areaName') or 'Unknown',
+                'positions': activity.get('positions') or [],
+                'ongoing': True
+            }
+        
+        # Finished walks replace the ongoing entry of the same walk: their end is final
+        for item in self._history('walkFeed'):
+            start, end = parse_timestamp(item.get('start')), parse_timestamp(item.get('end'))
+            if item.get('__typename') != 'Walk' or not start or not end:
+                continue
+            walks[self.walk_id(start)] = {
+                'id': self.walk_id(start),
+                'start_time': start.isoformat(),
+                'end_time': end.isoformat(),
+                'duration': int((end - start).total_seconds()),
+                'steps': item.get('totalSteps') or 0,
+                'distance': item.get('distance') or 0,
+                'location': item.get('areaName') or 'Unknown',
+                'positions': item.get('positions') or [],
+                'ongoing': False
+            }
+        
+        by_date: Dict[str, List[Dict]] = {}
+        for walk in walks.values():
+            date_str = parse_timestamp(walk['start_time']).astimezone().strftime('%Y-%m-%d')
+            by_date.setdefault(date_str, []).append(walk)
+        return by_date
 
 
 class FiSync:
@@ -105,10 +1803,42 @@ class FiSync:
     
     def __init__(self):
         self.validate_config()
-        self.supabase = SupabaseClient(SUPABASE_URL, SUPABASE_ANON_KEY)
-        self.fi_client = None
+        self.supabase = AsyncSupabaseClient(SUPABASE_URL, SUPABASE_ANON_KEY)
+        self.spool = WriteSpool(SPOOL_PATH) if SPOOL_PATH and not DRY_RUN else None
+        self.fi_session: Optional[FiSession] = None
         self.pet = None
+        self.state_lock = threading.Lock()
+        self.log_timings = True  # Cleared if bailey_fi_sync_log lacks the timing columns
+        self.publish_snapshots = PUBLISH_SNAPSHOT  # Cleared if bailey_fi_snapshot doesn't exist
+        self.reset_run_state()
+    
+    def reset_run_state(self):
+        """Clear per-run buffers and counters; connections are kept"""
+        self.writes = WriteBuffer(self.supabase, BATCH_SIZE, self.spool)
+        self.metrics = SyncMetrics()
+        self.supabase.metrics = self.metrics
+        if self.fi_session:
+            self.fi_session.metrics = self.metrics
         self.sync_log_id = None
+        # fi_walk_id -> stored end_time, for the walks already in the window
+        self.known_walks: Dict[str, Optional[datetime]] = {}
+        # fi_walk_id -> (kept position list, track hash, replaces a stored track), written once the walk rows exist
+        self.pending_tracks: Dict[str, tuple] = {}
+        # End of the earliest walk whose track didn't get written; holds back the walks watermark
+        self.unwritten_track_end: Optional[datetime] = None
+        # Per-stream high-water marks: `since` filters this run, `seen` is
+        # the newest record queued and becomes the next run's watermark
+        self.since: Dict[str, Optional[datetime]] = {'activity': None, 'walks': None, 'sleep': None}
+        self.seen: Dict[str, datetime] = {}
+        self.track_points = {'raw': 0, 'kept': 0}
+        # Failed (stream, day) fetches; any of them keeps the watermarks where they are
+        self.fetch_errors: List[str] = []
+        # Rows that failed this run: 'kept' in the spool for a retry, or 'dead'-lettered
+        self.unwritten_rows = {'kept': 0, 'dead': 0}
+        # Days whose activity or sleep rows were queued; their weeks and months get new rollups
+        self.touched_dates: set = set()
+        # stream -> first day Fi still has, for feeds that ran out inside the window
+        self.history_starts: Dict[str, str] = {}
         self.stats = {
             'activities': 0,
             'walks': 0,
@@ -123,7 +1853,7 @@ class FiSync:
         if not SUPABASE_URL or not SUPABASE_ANON_KEY:
             raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in .env.local")
     
-    def log_sync_start(self, sync_type: str = 'manual'):
+    async def log_sync_start(self, sync_type: str = 'manual'):
         """Log sync start"""
         log_entry = {
             'sync_type': sync_type,
@@ -132,58 +1862,161 @@ class FiSync:
         }
         
         if not DRY_RUN:
-            result = self.supabase.insert('bailey_fi_sync_log', log_entry)
-            if result and len(result) > 0:
-                self.sync_log_id = result[0].get('id')
+            try:
+                result = await self.supabase.insert('bailey_fi_sync_log', log_entry)
+                if result and len(result) > 0:
+                    self.sync_log_id = result[0].get('id')
+            except (httpx.HTTPError, CircuitOpenError) as e:
+                # Rows are spooled, so an unreachable database doesn't stop the sync
+                print(f"⚠️  Could not write sync log, continuing: {e}")
         
         print(f"🚀 Sync started ({sync_type} mode)")
     
-    def log_sync_complete(self, success: bool = True, error: Optional[str] = None):
+    def sync_status(self, success: bool) -> str:
+        """'failed', 'partial' when rows this run couldn't be written, or 'success'"""
+        if not success:
+            return 'failed'
+        return 'partial' if any(self.unwritten_rows.values()) else 'success'
+    
+    def unwritten_summary(self) -> str:
+        return (f"{self.unwritten_rows['kept']} rows spooled for the next run, "
+                f"{self.unwritten_rows['dead']} dead-lettered")
+    
+    async def log_sync_complete(self, success: bool = True, error: Optional[str] = None):
         """Log sync completion"""
         if not self.sync_log_id or DRY_RUN:
             return
         
+        status = self.sync_status(success)
         update_data = {
             'completed_at': datetime.now(timezone.utc).isoformat(),
-            'status': 'success' if success else 'failed',
+            'status': status,
             'records_synced': sum(self.stats.values()),
-            'error_message': error
+            'error_message': error or (self.unwritten_summary() if status == 'partial' else None)
         }
+        params = {'id': f'eq.{self.sync_log_id}'}
         
-        self.supabase._request(
-            'PATCH',
-            'bailey_fi_sync_log',
-            data=update_data,
-            params={'id': f'eq.{self.sync_log_id}'}
-        )
+        try:
+            try:
+                await self.patch_sync_log(update_data, params)
+            except httpx.HTTPStatusError as e:
+                if status != 'partial' or pg_error_code(e) != '23514':
+                    raise
+                # Migration sync_log_partial_status.sql not applied yet; error_message still says why
+                print("⚠️  bailey_fi_sync_log doesn't allow 'partial' yet, logging it as success")
+                await self.patch_sync_log({**update_data, 'status': 'success'}, params)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            print(f"⚠️  Could not update sync log {self.sync_log_id}: {e}")
+    
+    async def patch_sync_log(self, update_data: Dict[str, Any], params: Dict[str, str]):
+        """PATCH the run's sync log row, with the timing columns when the table has them"""
+        if self.log_timings:
+            try:
+                await self.supabase.patch('bailey_fi_sync_log', {**update_data, **self.sync_log_timings()}, params=params)
+                return
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 400 or pg_error_code(e) == '23514':
+                    raise
+                # Migration add_sync_log_timings.sql not applied yet
+                print("⚠️  bailey_fi_sync_log has no timing columns, logging without them")
+                self.log_timings = False
+        
+        await self.supabase.patch('bailey_fi_sync_log', update_data, params=params)
+    
+    async def publish_snapshot(self):
+        """Upsert the latest collar state that dashboards read instead of asking Fi
+
+        Written straight to Supabase rather than through the spool: a
+        snapshot is only worth having while it is fresh, and the next tick
+        publishes a newer one.
+        """
+        if DRY_RUN or not self.publish_snapshots or not self.pet:
+            return
+        try:
+            row = await asyncio.to_thread(self.pet.snapshot_row)
+            await self.supabase.upsert('bailey_fi_snapshot', row, on_conflict='pet_id', returning='minimal')
+            print(f"📸 Snapshot published: {row['steps']} steps, {row['activity_type'] or 'no activity'}")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 404:
+                print(f"⚠️  Could not publish snapshot: {e}")
+                return
+            # Migration create_fi_snapshot.sql not applied yet
+            print("⚠️  bailey_fi_snapshot doesn't exist, not publishing snapshots")
+            self.publish_snapshots = False
+        except (httpx.HTTPError, CircuitOpenError, FiAuthError, requests.RequestException, ValueError) as e:
+            # Only reached if the Fi feeds failed earlier in the run and fail again here
+            print(f"⚠️  Could not publish snapshot: {e}")
+    
+    def sync_log_timings(self) -> Dict[str, Any]:
+        """Per-stage timing columns for bailey_fi_sync_log"""
+        totals = self.metrics.totals()
+        return {
+            'duration_ms': int((time.perf_counter() - self.metrics.started) * 1000),
+            'connect_ms': self.metrics.stage_ms('connect_fi'),
+            'activity_ms': self.metrics.stage_ms('activity'),
+            'walks_ms': self.metrics.stage_ms('walks'),
+            'sleep_ms': self.metrics.stage_ms('sleep'),
+            'write_ms': self.metrics.stage_ms('write'),
+            'locations_ms': self.metrics.stage_ms('locations'),
+            'request_count': totals['count'],
+            'bytes_sent': totals['bytes_sent'],
+            'retry_count': totals['retries']
+        }
+    
+    def export_metrics(self, sync_type: str, success: bool):
+        """Write this run's metrics as a JSON line and/or Prometheus textfile"""
+        try:
+            if METRICS_FILE:
+                self.metrics.write_json_line(
+                    METRICS_FILE,
+                    sync_log_id=self.sync_log_id,
+                    sync_type=sync_type,
+                    status=self.sync_status(success),
+                    dry_run=DRY_RUN,
+                    records=self.stats,
+                    changes=self.writes.changes,
+                    totals=self.metrics.totals()
+                )
+            if METRICS_PROM_FILE:
+                self.metrics.write_prometheus(METRICS_PROM_FILE, success, self.stats)
+        except OSError as e:
+            print(f"⚠️  Could not write sync metrics: {e}")
     
     async def connect_fi(self):
         """Connect to Fi API and get pet"""
-        print("🔌 Connecting to Fi API...")
-        
         try:
-            self.fi_client = PyTryFi(FI_EMAIL, FI_PASSWORD)
-            await self.fi_client.login()
-            
-            # Get household and pets
-            households = await self.fi_client.get_households()
-            if not households:
-                raise ValueError("No households found")
-            
-            household: FiHousehold = households[0]
-            pets = await household.get_pets()
+            # The daemon keeps one warm session across ticks
+            if not self.fi_session:
+                print("🔌 Connecting to Fi API...")
+                self.fi_session = FiSession(FI_EMAIL, FI_PASSWORD)
+                self.fi_session.metrics = self.metrics
+                await asyncio.to_thread(self.fi_session.connect)
             
-            if not pets:
-                raise ValueError("No pets found in household")
-            
-            # Use first pet (Bailey)
-            self.pet: Pet = pets[0]
+            # A fresh FiPet per run so every tick re-reads the feeds
+            pet_id, pet_name = await asyncio.to_thread(self.fi_session.resolve_pet)
+            self.pet = FiPet(self.fi_session, pet_id, pet_name)
             print(f"✅ Connected! Found pet: {self.pet.name}")
             
         except Exception as e:
             print(f"❌ Fi connection error: {e}")
             raise
     
+    async def load_known_walks(self, start_date: datetime, end_date: datetime):
+        """Load the fi_walk_ids and end times already stored for the sync window in one query"""
+        try:
+            # Keyset pages, so long windows aren't cut off at PostgREST's row cap
+            rows = [row async for row in self.supabase.iter_select('bailey_walks', ('fi_walk_id',), ['end_time'], params={
+                'fi_walk_id': 'not.is.null',
+                'and': f"(date.gte.{start_date.strftime('%Y-%m-%d')},date.lte.{end_date.strftime('%Y-%m-%d')})"
+            })]
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            # Walks are upserted on fi_walk_id, so an empty index only costs extra writes
+            print(f"⚠️  Could not load stored walks, upserting all: {e}")
+            rows = []
+        
+        self.known_walks = {row['fi_walk_id']: parse_timestamp(row.get('end_time')) for row in rows}
+        print(f"🗂️  {len(self.known_walks)} Fi walks already stored in this window")
+    
     def sync_daily_activity(self, date: datetime):
         """Sync daily activity summary for a specific date"""
         if not self.pet:
@@ -194,13 +2027,17 @@ class FiSync:
         
         try:
             # Get daily stats from Fi
-            # Note: pytryfi may have different methods - adjust as needed
             stats = self.pet.daily_stats.get(date_str, {})
             
             if not stats:
                 print(f"  ⏭️  No data for {date_str}")
                 return
             
+            day_start = datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            if self.since['activity'] and day_start < self.since['activity'].replace(hour=0, minute=0, second=0, microsecond=0):
+                print(f"  ⏭️  Activity for {date_str} is before the watermark")
+                return
+            
             activity_data = {
                 'date': date_str,
                 'total_steps': stats.get('step_count', 0),
@@ -219,12 +2056,16 @@ class FiSync:
             if DRY_RUN:
                 print(f"  [DRY RUN] Would upsert activity: {activity_data}")
             else:
-                self.supabase.upsert('bailey_fi_activity', activity_data)
-                self.stats['activities'] += 1
-                print(f"  ✅ Activity synced: {activity_data['total_steps']} steps")
+                self.note_watermark('activity', day_start)
+                if self.writes.add('bailey_fi_activity', activity_data, on_conflict='date'):
+                    self.touched_dates.add(day_start.date())
+                    print(f"  📥 Activity queued: {activity_data['total_steps']} steps")
+                else:
+                    print(f"  ⏭️  Activity unchanged: {activity_data['total_steps']} steps")
                 
         except Exception as e:
             print(f"  ❌ Error syncing activity: {e}")
+            raise
     
     def sync_walks(self, date: datetime):
         """Sync walks for a specific date"""
@@ -235,10 +2076,15 @@ class FiSync:
         print(f"🚶 Syncing walks for {date_str}...")
         
         try:
-            # Get walks from Fi (adjust API call as needed)
+            # Get walks from Fi
             walks = getattr(self.pet, 'walks', {}).get(date_str, [])
             
             for walk in walks:
+                walk_end = parse_timestamp(walk.get('end_time'))
+                track_hash = self.unwritten_track(walk.get('id'), walk.get('positions') or [])
+                if self.since['walks'] and walk_end and walk_end <= self.since['walks'] and not track_hash:
+                    continue
+                
                 walk_data = {
                     'fi_walk_id': walk.get('id'),
                     'date': date_str,
@@ -254,24 +2100,38 @@ class FiSync:
                     'synced_from_fi': True
                 }
                 
+                track, polyline, metrics = self.process_track(walk.get('positions') or [])
+                if STORE_POLYLINE:
+                    walk_data['path_polyline'] = polyline
+                if metrics:
+                    self.fill_walk_metrics(walk_data, metrics)
+                
                 if DRY_RUN:
                     print(f"  [DRY RUN] Would insert walk: {walk_data}")
+                elif (not walk.get('ongoing') and not track_hash
+                      and self.known_walks.get(walk_data['fi_walk_id']) == walk_end):
+                    # Stored with its final end; a walk stored while ongoing is rewritten once finished
+                    print(f"  ⏭️  Walk already exists: {walk_data['fi_walk_id']}")
                 else:
-                    # Check if walk already exists
-                    existing = self.supabase.select(
-                        'bailey_walks',
-                        params={'fi_walk_id': f"eq.{walk_data['fi_walk_id']}"}
-                    )
-                    
-                    if not existing:
-                        self.supabase.insert('bailey_walks', walk_data)
-                        self.stats['walks'] += 1
-                        print(f"  ✅ Walk synced: {walk_data['duration_minutes']}min, {walk_data['steps']} steps")
+                    # fi_walk_id is UNIQUE, so the upsert also covers walks
+                    # written by another sync since the index was loaded
+                    changed = self.writes.add('bailey_walks', walk_data, on_conflict='fi_walk_id')
+                    self.note_watermark('walks', walk_end)
+                    if walk_data['fi_walk_id']:
+                        stored = walk_data['fi_walk_id'] in self.known_walks
+                        self.known_walks[walk_data['fi_walk_id']] = walk_end
+                        # The track has its own hash: a walk row written in an earlier
+                        # run doesn't mean its track made it too
+                        if track and (changed or track_hash):
+                            self.pending_tracks[walk_data['fi_walk_id']] = (track, track_hash, stored)
+                    if changed:
+                        print(f"  📥 Walk queued: {walk_data['duration_minutes']}min, {walk_data['steps']} steps")
                     else:
-                        print(f"  ⏭️  Walk already exists: {walk_data['fi_walk_id']}")
+                        print(f"  ⏭️  Walk unchanged: {walk_data['fi_walk_id']}")
                         
         except Exception as e:
             print(f"  ❌ Error syncing walks: {e}")
+            raise
     
     def sync_sleep(self, date: datetime):
         """Sync sleep/rest data for a specific date"""
@@ -286,75 +2146,812 @@ class FiSync:
             sleep_data = getattr(self.pet, 'sleep', {}).get(date_str, [])
             
             for period in sleep_data:
+                sleep_end = parse_timestamp(period.get('end_time'))
+                if self.since['sleep'] and sleep_end and sleep_end <= self.since['sleep']:
+                    continue
+                
+                sleep_start = parse_timestamp(period.get('start_time'))
                 sleep_record = {
                     'date': date_str,
                     'sleep_type': period.get('type', 'rest'),  # nap, rest, deep_sleep
-                    'start_time': period.get('start_time'),
+                    'start_time': sleep_start.isoformat() if sleep_start else None,
                     'end_time': period.get('end_time'),
                     'duration_minutes': period.get('duration', 0) // 60,
                     'quality_score': period.get('quality', None)
                 }
                 
                 if DRY_RUN:
-                    print(f"  [DRY RUN] Would insert sleep: {sleep_record}")
+                    print(f"  [DRY RUN] Would upsert sleep: {sleep_record}")
                 else:
-                    self.supabase.insert('bailey_fi_sleep', sleep_record)
-                    self.stats['sleep_records'] += 1
-                    print(f"  ✅ Sleep synced: {sleep_record['sleep_type']}, {sleep_record['duration_minutes']}min")
+                    # (start_time, sleep_type) is unique: a rest still in progress
+                    # is updated in place as it grows instead of duplicated
+                    self.note_watermark('sleep', sleep_end)
+                    if self.writes.add('bailey_fi_sleep', sleep_record, on_conflict='start_time,sleep_type'):
+                        self.touched_dates.add(date.date())
+                        print(f"  📥 Sleep queued: {sleep_record['sleep_type']}, {sleep_record['duration_minutes']}min")
                     
         except Exception as e:
             print(f"  ❌ Error syncing sleep: {e}")
+            raise
     
-    async def run_sync(self, sync_type: str = 'manual'):
-        """Run complete sync process"""
+    async def load_watermarks(self):
+        """Load per-stream high-water marks and set this run's `since` filters"""
         try:
-            self.log_sync_start(sync_type)
-            
-            # Connect to Fi
-            await self.connect_fi()
-            
-            # Sync data for the last N days
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=DAYS_TO_SYNC)
+            rows = await self.supabase.select('bailey_fi_sync_state', params={'select': 'stream,watermark'}) or []
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            print(f"⚠️  Could not load watermarks, syncing the full window: {e}")
+            rows = []
+        overlap = timedelta(hours=OVERLAP_HOURS)
+        
+        for row in rows:
+            mark = parse_timestamp(row.get('watermark'))
+            if row.get('stream') in self.since and mark:
+                self.since[row['stream']] = mark - overlap
+    
+    def note_watermark(self, stream: str, value: Optional[datetime]):
+        """Remember the newest record queued for a stream
+
+        Capped at the time Fi was read: a daily rest summary ends at the next
+        midnight, and a mark in the future would filter out that day's
+        summary once it is complete.
+        """
+        if not value:
+            return
+        value = min(value, (self.pet.fetched_at if self.pet else None) or datetime.now(timezone.utc))
+        with self.state_lock:
+            if stream not in self.seen or value > self.seen[stream]:
+                self.seen[stream] = value
+    
+    def covered_marks(self) -> Dict[str, datetime]:
+        """How far this run's Fi read covered each stream, in the streams' watermark terms
+
+        The feeds were read at fetched_at, so every walk and rest that had
+        ended by then has been seen; activity marks are day starts.
+        """
+        fetched = self.pet.fetched_at if self.pet else None
+        if not fetched:
+            return {}
+        today = datetime.strptime(fetched.astimezone().strftime('%Y-%m-%d'), '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        return {'activity': today, 'walks': fetched, 'sleep': fetched}
+    
+    async def save_watermarks(self) -> List[Dict[str, Any]]:
+        """Advance the stored watermarks after a successful run
+
+        Each stream moves to its newest record written, or to how far the
+        Fi read covered it if that is later: a stream with nothing new (no
+        walks today) still advances, so it doesn't hold every later run
+        to the full window. They go through the spool like the data rows,
+        which are already durable there by now.
+        """
+        if DRY_RUN:
+            return []
+        
+        marks = dict(self.covered_marks())
+        for stream, mark in self.seen.items():
+            marks[stream] = max(mark, marks.get(stream, mark))
+        if self.unwritten_track_end and 'walks' in marks:
+            # Keep that walk inside the next run's window so its track is fetched again
+            marks['walks'] = min(marks['walks'], self.unwritten_track_end - timedelta(seconds=1))
+        if not marks:
+            return []
+        
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {'stream': stream, 'watermark': mark.isoformat(), 'updated_at': now}
+            for stream, mark in marks.items()
+        ]
+        self.writes.add_many('bailey_fi_sync_state', rows, on_conflict='stream')
+        return await self.writes.flush('bailey_fi_sync_state')
+    
+    async def replay_spool(self) -> List[Dict[str, Any]]:
+        """Write rows a previous run spooled but couldn't get into Supabase"""
+        if not self.spool:
+            return []
+        entries = self.spool.pending()
+        if not entries:
+            return []
+        
+        print(f"\n♻️  Replaying {len(entries)} spooled rows from an earlier run")
+        groups: Dict[tuple, List[Dict]] = {}
+        for entry in entries:
+            groups.setdefault((entry['table'], entry['on_conflict'], entry['ignore_duplicates']), []).append(entry)
+        for (table, on_conflict, ignore), group in groups.items():
+            if table in ('bailey_fi_activity', 'bailey_fi_sleep'):
+                self.touched_dates.update(datetime.strptime(e['row']['date'], '%Y-%m-%d').date() for e in group)
+            self.writes.add_many(table, [e['row'] for e in group], on_conflict, ignore,
+                                 seqs=[e['seq'] for e in group])
+        return await self.writes.flush()
+    
+    async def update_rollups(self, dates=None) -> List[Dict[str, Any]]:
+        """Recompute the week and month rollups covering the touched dates
+
+        Each period is rebuilt from its raw rows rather than adjusted by
+        what this run wrote, so overlaps, replays and sleep periods that
+        grew in place can't be counted twice.
+        """
+        periods = rollup_periods(self.touched_dates if dates is None else dates)
+        if not periods or DRY_RUN or not ROLLUPS_ENABLED:
+            return []
+        
+        first = min(p[1] for p in periods).isoformat()
+        last = max(p[2] for p in periods).isoformat()
+        window = {'and': f'(date.gte.{first},date.lte.{last})'}
+        try:
+            activity = [row async for row in self.supabase.iter_select(
+                'bailey_fi_activity', ('date', 'id'),
+                ['total_steps', 'total_distance_meters', 'total_calories', 'walk_count',
+                 'active_minutes', 'play_minutes', 'goal_achieved'], window
+            )]
+            sleep = [row async for row in self.supabase.iter_select(
+                'bailey_fi_sleep', ('date', 'id'), ['sleep_type', 'duration_minutes'], window
+            )]
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            print(f"⚠️  Could not read {first}..{last} back, rollups left as they were: {e}")
+            return []
+        
+        rows = [build_rollup(period, start, end, activity, sleep) for period, start, end in periods]
+        weeks = sum(1 for row in rows if row['period'] == 'week')
+        print(f"📈 Rollups: {weeks} week(s), {len(rows) - weeks} month(s) recomputed")
+        self.writes.add_many('bailey_fi_activity_rollups', rows, on_conflict='period,period_start')
+        return await self.writes.flush('bailey_fi_activity_rollups')
+    
+    async def sync_window(self, full: bool = False) -> tuple:
+        """Pick the date range: from the oldest watermark, or the last N days"""
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=DAYS_TO_SYNC)
+        
+        if not full and not DRY_RUN:
+            await self.load_watermarks()
+        
+        marks = list(self.since.values())
+        if all(marks):
+            start_date = min(marks).astimezone().replace(tzinfo=None)
+            print(f"\n📅 Incremental sync from {start_date:%Y-%m-%d %H:%M} ({OVERLAP_HOURS:g}h overlap)")
+            for stream, mark in self.since.items():
+                print(f"  {stream}: after {mark:%Y-%m-%d %H:%M} UTC")
+        else:
+            # A stream without a watermark needs the full window; the others keep their filters
+            label = 'Full resync' if full else 'Syncing'
+            print(f"\n📅 {label}: {DAYS_TO_SYNC} days of data ({start_date.date()} to {end_date.date()})")
+            if any(marks):
+                print(f"  No watermark yet for {', '.join(s for s, m in self.since.items() if not m)}")
+        
+        return start_date, end_date
+    
+    async def run_sync(self, sync_type: str = 'manual', full: bool = False,
+                       window: Optional[tuple] = None):
+        """Run complete sync process
+
+        `window` = (start, end) syncs exactly that date range from the FiPet
+        the caller already connected, as backfill shards do: watermarks are
+        neither read nor advanced, and the spool is left to the regular runs
+        to replay.
+        """
+        self.reset_run_state()
+        # A full resync rewrites every row, even ones the hash cache says are unchanged
+        self.writes.detect_changes = not full
+        success = False
+        
+        try:
+            await self.log_sync_start(sync_type)
+            if not window:
+                self.record_write_results(await self.replay_spool())
             
-            print(f"\n📅 Syncing {DAYS_TO_SYNC} days of data ({start_date.date()} to {end_date.date()})")
+            # Sync from the stored watermarks, or the last N days
+            if window:
+                # Shards share the backfill's FiPet, whose feeds already reach the oldest shard
+                start_date, end_date = window
+                print(f"\n📅 Backfill shard: {start_date.date()} to {end_date.date()}")
+            else:
+                # Connect to Fi
+                with self.metrics.stage('connect_fi'):
+                    await self.connect_fi()
+                start_date, end_date = await self.sync_window(full)
+                # Fi's feeds page back from today, so they must reach start_date
+                self.pet.start = start_date.date()
             print("=" * 60)
             
+            if not DRY_RUN:
+                await self.load_known_walks(start_date, end_date)
+            
+            dates = []
             current_date = start_date
             while current_date <= end_date:
-                print(f"\n📆 Processing {current_date.date()}")
-                print("-" * 60)
-                
-                self.sync_daily_activity(current_date)
-                self.sync_walks(current_date)
-                self.sync_sleep(current_date)
-                
+                dates.append(current_date)
                 current_date += timedelta(days=1)
             
+            results = await self.run_pipeline(dates)
+            self.record_write_results(results)
+            self.report_history(start_date)
+            with self.metrics.stage('locations'):
+                self.record_write_results(await self.sync_locations())
+            if not window:
+                # Backfill shards split weeks, so run_backfill rebuilds the range once at the end
+                with self.metrics.stage('rollups'):
+                    self.record_write_results(await self.update_rollups())
+                with self.metrics.stage('snapshot'):
+                    await self.publish_snapshot()
+            if self.fetch_errors:
+                # Keep the watermarks so the next run fetches these days again
+                raise RuntimeError(f"{len(self.fetch_errors)} fetch(es) failed, first: {self.fetch_errors[0]}")
+            if not window:
+                with self.metrics.stage('watermarks'):
+                    self.record_write_results(await self.save_watermarks())
+            
             # Summary
             print("\n" + "=" * 60)
-            print("✅ SYNC COMPLETE!")
+            if self.sync_status(True) == 'partial':
+                print(f"⚠️  SYNC PARTIAL: {self.unwritten_summary()}")
+            else:
+                print("✅ SYNC COMPLETE!")
             print(f"📊 Activities synced: {self.stats['activities']}")
             print(f"🚶 Walks synced: {self.stats['walks']}")
             print(f"😴 Sleep records synced: {self.stats['sleep_records']}")
+            print(f"🗺️  Locations synced: {self.stats['locations']}")
+            if self.track_points['raw']:
+                ratio = self.track_points['raw'] / max(self.track_points['kept'], 1)
+                print(f"🗜️  GPS points kept: {self.track_points['kept']} of {self.track_points['raw']} ({ratio:.1f}x reduction)")
             print(f"📍 Total records: {sum(self.stats.values())}")
+            if self.writes.changes:
+                print("🔁 Changed/unchanged rows: " + ", ".join(
+                    f"{table} {counts['changed']}/{counts['unchanged']}"
+                    for table, counts in sorted(self.writes.changes.items())
+                ))
             
             if DRY_RUN:
                 print("\n⚠️  DRY RUN MODE - No data was actually saved")
             
-            self.log_sync_complete(success=True)
+            success = True
+            await self.log_sync_complete(success=True)
             
         except Exception as e:
             print(f"\n❌ SYNC FAILED: {e}")
-            self.log_sync_complete(success=False, error=str(e))
+            await self.log_sync_complete(success=False, error=str(e))
             raise
         finally:
-            # Logout from Fi
-            if self.fi_client:
+            self.report_connection_stats()
+            self.export_metrics(sync_type, success)
+    
+    async def run_daemon(self, interval_minutes: float = SYNC_INTERVAL_MINUTES,
+                         sync_type: str = 'auto', full: bool = False):
+        """Stay resident and sync every interval until SIGTERM/SIGINT
+
+        The Fi session and Supabase connection pool stay open between ticks.
+        A signal lets the tick in progress finish before shutting down.
+        """
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        
+        print(f"🛰️  Fi sync daemon started (every {interval_minutes:g} min)")
+        tick = 0
+        
+        while not stop.is_set():
+            tick += 1
+            print(f"\n⏱️  Tick {tick} - {datetime.now():%Y-%m-%d %H:%M:%S}")
+            try:
+                await self.run_sync(sync_type, full=full and tick == 1)
+            except Exception as e:
+                print(f"⚠️  Tick {tick} failed, will retry next interval: {e}")
+            
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval_minutes * 60)
+            except asyncio.TimeoutError:
+                pass
+        
+        print("👋 Fi sync daemon stopped")
+    
+    async def close(self):
+        """Close HTTP connections; the Fi session stays cached for the next run"""
+        if self.fi_session:
+            self.fi_session.close()
+        await self.supabase.close()
+        if self.spool:
+            self.spool.close()
+    
+    def sync_day(self, date: datetime):
+        """Fetch one day from Fi and queue its rows"""
+        print(f"\n📆 Processing {date.date()}")
+        print("-" * 60)
+        
+        for stage, sync in (('activity', self.sync_daily_activity),
+                            ('walks', self.sync_walks),
+                            ('sleep', self.sync_sleep)):
+            with self.metrics.stage(stage):
+                try:
+                    sync(date)
+                except Exception as e:
+                    # One failed stream doesn't stop the others for this day
+                    with self.state_lock:
+                        self.fetch_errors.append(f"{stage} {date.date()}: {e}")
+    
+    async def run_pipeline(self, dates: List[datetime]) -> List[Dict[str, Any]]:
+        """Queue every day's rows, then write them in chunks
+
+        FiPet reads the whole window in one snapshot and each day only
+        slices it, so the days are queued one after another in a single
+        worker thread. The chunks are then written on the event loop, at
+        most CONCURRENCY at a time.
+        """
+        def fetch():
+            for date in dates:
+                self.sync_day(date)
+        
+        await asyncio.to_thread(fetch)
+        
+        slots = asyncio.Semaphore(max(CONCURRENCY, 1))
+        
+        async def write(job: Dict[str, Any]) -> Dict[str, Any]:
+            async with slots:
+                with self.metrics.stage('write'):
+                    return await self.writes.write(job)
+        
+        if self.writes.pending():
+            print(f"\n💾 Writing {self.writes.pending()} buffered rows")
+            print("-" * 60)
+        return list(await asyncio.gather(*(write(job) for job in self.writes.drain())))
+    
+    def report_history(self, start_date: datetime):
+        """Warn about days before the start of Fi's history, which no run can fill"""
+        for alias, first_day in sorted(self.pet.history_starts.items()):
+            if first_day <= start_date.date():
+                continue
+            stream = FEED_STREAMS[alias]
+            self.history_starts[stream] = first_day.isoformat()
+            print(f"⚠️  Fi has no {stream} before {first_day}: "
+                  f"{start_date.date()}..{first_day - timedelta(days=1)} can't be synced")
+    
+    def unwritten_track(self, fi_walk_id: Optional[str], positions: List[Dict]) -> Optional[str]:
+        """Hash of a walk's Fi track if that version isn't fully written yet, else None
+
+        Track hashes live in the spool next to the row hashes, keyed by
+        fi_walk_id. Without a spool there is nothing to compare, and tracks
+        follow their walk rows as before.
+        """
+        if not self.spool or not fi_walk_id or not positions:
+            return None
+        digest = row_hash({'positions': positions})
+        if self.spool.hashes('bailey_fi_locations', [fi_walk_id]).get(fi_walk_id) == digest:
+            return None
+        return digest
+    
+    def process_track(self, positions: List[Dict]) -> tuple:
+        """Measure and simplify a walk's GPS track
+
+        Returns (kept points, encoded polyline, metrics); metrics come from
+        the raw track, before simplification drops any points.
+        """
+        index, lat, lon, seconds = track_arrays(positions)
+        if not len(index):
+            return [], None, None
+        
+        metrics = walk_metrics(lat, lon, seconds)
+        keep = simplify_track(lat, lon, TRACK_TOLERANCE_M)
+        kept = [positions[i] for i in index[keep]]
+        
+        with self.state_lock:
+            self.track_points['raw'] += len(positions)
+            self.track_points['kept'] += len(kept)
+        
+        reduction = 1 - len(kept) / len(positions)
+        print(f"  🗜️  Track: {len(positions)} → {len(kept)} points ({reduction:.0%} smaller)")
+        if metrics:
+            print(f"  📐 {metrics['distance_m'] / 1000:.2f} km, {metrics['moving_s'] / 60:.0f} min moving, "
+                  f"{metrics['pace_min_per_km']:.1f} min/km, max {metrics['max_speed_mps'] * MPS_TO_MPH:.1f} mph, "
+                  f"{metrics['stops']} stops")
+        return kept, encode_polyline(lat[keep], lon[keep]), metrics
+    
+    @staticmethod
+    def fill_walk_metrics(walk_data: Dict, metrics: Dict[str, float]):
+        """Fill walk columns the Fi API left empty from computed track metrics"""
+        if not walk_data['distance_meters']:
+            walk_data['distance_meters'] = round(metrics['distance_m'], 2)
+        if not walk_data['duration_minutes']:
+            walk_data['duration_minutes'] = int(metrics['duration_s'] // 60)
+        if not walk_data['avg_speed_mph']:
+            walk_data['avg_speed_mph'] = round(metrics['avg_speed_mps'] * MPS_TO_MPH, 2)
+    
+    def iter_location_rows(self, walk_uuid: str, positions: List[Dict]):
+        """Turn Fi position points into bailey_fi_locations rows, one at a time"""
+        for point in positions:
+            timestamp = parse_timestamp(point.get('date'))
+            position = point.get('position') or {}
+            if not timestamp or position.get('latitude') is None or position.get('longitude') is None:
+                continue
+            
+            yield {
+                'walk_id': walk_uuid,
+                'latitude': position['latitude'],
+                'longitude': position['longitude'],
+                'accuracy_meters': point.get('errorRadius'),
+                'timestamp': timestamp.isoformat()
+            }
+    
+    async def sync_locations(self) -> List[Dict[str, Any]]:
+        """Write the GPS points of the walks just written into bailey_fi_locations"""
+        if not self.pending_tracks:
+            return []
+        
+        print(f"\n🗺️  Syncing GPS tracks for {len(self.pending_tracks)} walk(s)...")
+        if DRY_RUN:
+            points = sum(len(track) for track, _, _ in self.pending_tracks.values())
+            print(f"  [DRY RUN] Would insert up to {points} location points")
+            return []
+        
+        # Look up the UUIDs of the walk rows in one request
+        fi_walk_ids = ','.join(f'"{walk_id}"' for walk_id in self.pending_tracks)
+        try:
+            rows = await self.supabase.select('bailey_walks', params={
+                'select': 'id,fi_walk_id',
+                'fi_walk_id': f'in.({fi_walk_ids})'
+            }) or []
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            # No track hash is recorded, so the next run queues these tracks again
+            print(f"  ⚠️  Could not look up walk ids, skipping tracks this run: {e}")
+            self.hold_tracks(self.pending_tracks)
+            return []
+        walk_uuids = {row['fi_walk_id']: row['id'] for row in rows}
+        queued: Dict[str, int] = {}
+        
+        for fi_walk_id, (positions, track_hash, stored) in self.pending_tracks.items():
+            walk_uuid = walk_uuids.get(fi_walk_id)
+            if not walk_uuid:
+                print(f"  ⚠️  Walk {fi_walk_id} not found, skipping its track")
+                self.hold_tracks([fi_walk_id])
+                continue
+            
+            if stored:
+                # A track that grew (ongoing walk) simplifies to different points;
+                # adding them to the old ones would store a union of simplifications
+                try:
+                    await self.supabase.delete('bailey_fi_locations', params={'walk_id': f'eq.{walk_uuid}'})
+                except (httpx.HTTPError, CircuitOpenError) as e:
+                    print(f"  ⚠️  Could not clear the old track of walk {fi_walk_id}, skipping it: {e}")
+                    self.hold_tracks([fi_walk_id])
+                    continue
+            
+            queued[fi_walk_id] = 0
+            for chunk in iter_chunks(self.iter_location_rows(walk_uuid, positions), BATCH_SIZE):
+                # (walk_id, timestamp) is unique; replayed points are skipped
+                queued[fi_walk_id] += self.writes.add_many('bailey_fi_locations', chunk,
+                                                           on_conflict='walk_id,timestamp',
+                                                           ignore_duplicates=True)
+        
+        # Every walk's points go out together, so short walks share chunks
+        print(f"  📍 {sum(queued.values())} points queued for {len(queued)} walk(s)")
+        results = await self.writes.flush('bailey_fi_locations')
+        
+        # A walk whose points didn't all land keeps its track unhashed and holds the watermark
+        failed_uuids = {row['walk_id'] for result in results for row in result.get('failed_rows', [])}
+        self.hold_tracks([walk_id for walk_id in queued if walk_uuids[walk_id] in failed_uuids])
+        written = [(walk_id, self.pending_tracks[walk_id][1]) for walk_id in queued
+                   if walk_uuids[walk_id] not in failed_uuids and self.pending_tracks[walk_id][1]]
+        if written:
+            self.spool.remember('bailey_fi_locations', written)
+        
+        return results
+    
+    def hold_tracks(self, fi_walk_ids):
+        """Note walks whose tracks weren't written, so the watermark stays before them"""
+        ends = [self.known_walks[walk_id] for walk_id in fi_walk_ids if self.known_walks.get(walk_id)]
+        if ends:
+            earliest = min(ends)
+            if not self.unwritten_track_end or earliest < self.unwritten_track_end:
+                self.unwritten_track_end = earliest
+    
+    def record_write_results(self, results: List[Dict[str, Any]]):
+        """Count rows from written chunks; failed rows stay spooled or are dead-lettered
+
+        Without a spool a failed chunk fails the sync, as its rows would be lost.
+        """
+        for result in results:
+            if result['table'] in TABLE_STATS:
+                self.stats[TABLE_STATS[result['table']]] += result['written']
+        
+        failed = [r for r in results if not r['ok']]
+        if not failed:
+            return
+        if not self.spool:
+            raise RuntimeError(f"{len(failed)} of {len(results)} write chunks failed")
+        
+        kept = sum(r['kept'] for r in failed)
+        dead = sum(r['dead'] for r in failed)
+        self.unwritten_rows['kept'] += kept
+        self.unwritten_rows['dead'] += dead
+        if kept:
+            print(f"  💾 {kept} rows from {len(failed)} failed chunk(s) kept in {self.spool.path} for the next run")
+        if dead:
+            print(f"  🪦 {dead} rows dead-lettered in {self.spool.path}; they won't be retried")
+    
+    def report_connection_stats(self):
+        """Print Supabase connection reuse for this run"""
+        conn = self.supabase.connection_stats()
+        if not conn['requests']:
+            return
+        
+        reuse_pct = conn['reused'] / conn['requests'] * 100
+        versions = '/'.join(conn.get('http_versions') or []) or 'HTTP'
+        print(f"🔌 Supabase {versions}: {conn['requests']} requests over {conn['connections']} connections "
+              f"({conn['reused']} reused, {reuse_pct:.0f}%)")
+
+
+def parse_backfill_range(text: str) -> tuple:
+    """'2025-01-01..2025-12-31' -> (start, end) datetimes, both inclusive"""
+    start_str, sep, end_str = text.partition('..')
+    if not sep:
+        raise ValueError(f"Expected START..END (YYYY-MM-DD..YYYY-MM-DD), got {text!r}")
+    start = datetime.strptime(start_str.strip(), '%Y-%m-%d')
+    end = datetime.strptime(end_str.strip(), '%Y-%m-%d')
+    if end < start:
+        raise ValueError(f"Backfill range ends before it starts: {text}")
+    return start, end
+
+
+def backfill_shards(start: datetime, end: datetime, shard_days: int) -> List[tuple]:
+    """Split [start, end] into consecutive (start, end) shards of shard_days"""
+    shards = []
+    current = start
+    while current <= end:
+        shard_end = min(current + timedelta(days=max(shard_days, 1) - 1), end)
+        shards.append((current, shard_end))
+        current = shard_end + timedelta(days=1)
+    return shards
+
+
+def load_backfill_state(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_backfill_state(path: str, state: Dict[str, Dict]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_backfill(range_text: str, shard_days: int = BACKFILL_SHARD_DAYS,
+                 state_path: str = BACKFILL_STATE) -> bool:
+    """Backfill a date range shard by shard; returns False if any shard failed
+
+    Fi's feeds are read once, back to the oldest shard left, and every
+    shard syncs its days from them; each shard's writes go out in
+    CONCURRENCY parallel chunks. Finished shards are checkpointed in
+    state_path, so running the same range again resumes with the shards
+    that are left.
+    """
+    start, end = parse_backfill_range(range_text)
+    shards = backfill_shards(start, end, shard_days)
+    range_key = f"{start:%Y-%m-%d}..{end:%Y-%m-%d}"
+    state = load_backfill_state(state_path)
+    done = state.setdefault(range_key, {})
+    
+    def shard_key(shard: tuple) -> str:
+        return f"{shard[0]:%Y-%m-%d}..{shard[1]:%Y-%m-%d}"
+    
+    todo = [shard for shard in shards if done.get(shard_key(shard), {}).get('status') != 'done']
+    print(f"🗄️  Backfill {range_key}: {len(shards)} shards of {shard_days} days, "
+          f"{len(shards) - len(todo)} already done")
+    if not todo:
+        print("✅ Nothing left to backfill")
+        return True
+    
+    os.makedirs(BACKFILL_LOG_DIR, exist_ok=True)
+    started = time.perf_counter()
+    rows = requests_sent = retries = failed = 0
+    history_starts: Dict[str, str] = {}
+    
+    async def run():
+        nonlocal rows, requests_sent, retries, failed
+        syncer = FiSync()
+        try:
+            await syncer.connect_fi()
+            # One FiPet for every shard, so the feeds are paged back only once
+            syncer.pet.start = todo[0][0].date()
+            
+            for finished, shard in enumerate(todo, 1):
+                name = shard_key(shard)
+                log_path = os.path.join(BACKFILL_LOG_DIR, f"{name}.log")
+                shard_started = time.perf_counter()
                 try:
-                    await self.fi_client.logout()
-                except:
-                    pass
+                    with open(log_path, 'w') as log, redirect_stdout(log):
+                        await syncer.run_sync('manual', window=shard)
+                except Exception as e:
+                    failed += 1
+                    done[name] = {'status': 'failed', 'error': f"{e} (see {log_path})"}
+                    print(f"  ❌ [{finished}/{len(todo)}] {name}: {e} (see {log_path})")
+                else:
+                    totals = syncer.metrics.totals()
+                    result = {
+                        'rows': sum(syncer.stats.values()),
+                        'stats': dict(syncer.stats),
+                        'requests': totals['count'],
+                        'retries': totals['retries'],
+                        'history_starts': syncer.history_starts,
+                        'seconds': round(time.perf_counter() - shard_started, 2)
+                    }
+                    rows += result['rows']
+                    requests_sent += result['requests']
+                    retries += result['retries']
+                    for stream, first_day in result['history_starts'].items():
+                        history_starts[stream] = max(first_day, history_starts.get(stream, first_day))
+                    done[name] = {'status': 'done', 'finished_at': datetime.now(timezone.utc).isoformat(), **result}
+                    elapsed = time.perf_counter() - started
+                    eta = elapsed / finished * (len(todo) - finished)
+                    print(f"  ✅ [{finished}/{len(todo)}] {name}: {result['rows']} rows in {result['seconds']:.1f}s"
+                          f" | total {rows} rows, {rows / elapsed:.0f} rows/s, ETA {eta:.0f}s")
+                save_backfill_state(state_path, state)
+        finally:
+            await syncer.close()
+    
+    asyncio.run(run())
+    
+    elapsed = time.perf_counter() - started
+    print("\n" + "=" * 60)
+    print(f"{'✅ BACKFILL COMPLETE' if not failed else '⚠️  BACKFILL INCOMPLETE'}: "
+          f"{len(todo) - failed}/{len(todo)} shards in {elapsed:.1f}s")
+    print(f"📍 {rows} rows ({rows / elapsed:.0f} rows/s), {requests_sent} requests, {retries} retries")
+    for stream, first_day in sorted(history_starts.items()):
+        # The feeds ran out: Fi doesn't keep this stream that far back, so rerunning won't help
+        print(f"⚠️  Fi has no {stream} before {first_day}; the backfill can't fill {start:%Y-%m-%d} up to it")
+    if failed:
+        print(f"🔁 Run the same --backfill again to retry the {failed} failed shard(s)")
+    if failed < len(todo):
+        rebuild_rollups(start, end)
+    return not failed
+
+
+def rebuild_rollups(start: datetime, end: datetime):
+    """Recompute every week and month overlapping start..end from the stored rows"""
+    async def run():
+        syncer = FiSync()
+        try:
+            days = [(start + timedelta(days=offset)).date() for offset in range((end - start).days + 1)]
+            syncer.record_write_results(await syncer.update_rollups(days))
+        finally:
+            await syncer.close()
+    
+    asyncio.run(run())
+
+
+class ArchiveWriter:
+    """Writes one table's rows into month partitions of Parquet files
+
+    Rows must arrive in partition-column order, so only one partition is
+    open at a time. It is written to a temp file and moved into place when
+    the next month starts, so a partition on disk is always complete.
+    """
+    
+    def __init__(self, pa, pq, table_dir: str, key: str, columns: Dict[str, str]):
+        self.pa, self.pq = pa, pq
+        self.table_dir = table_dir
+        self.key = key
+        self.columns = columns
+        arrow_types = {
+            'str': pa.string(), 'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(),
+            'date': pa.date32(), 'timestamp': pa.timestamp('us', tz='UTC')
+        }
+        self.schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns.items()])
+        self.month: Optional[str] = None
+        self.writer = None
+        self.buffer: Dict[str, List] = {}
+        self.rows = 0
+        self.months: List[str] = []
+    
+    @staticmethod
+    def convert(kind: str, value: Any) -> Any:
+        """PostgREST JSON value -> Python value Arrow accepts for the column type"""
+        if value is None:
+            return None
+        if kind == 'date':
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        if kind == 'timestamp':
+            return parse_timestamp(value)
+        if kind == 'int':
+            return int(value)
+        if kind == 'float':
+            return float(value)
+        if kind == 'bool':
+            return bool(value)
+        return str(value)
+    
+    def partition_path(self, month: str) -> str:
+        return os.path.join(self.table_dir, f"month={month}", 'part.parquet')
+    
+    def add(self, row: Dict[str, Any]):
+        month = str(row[self.key])[:7]
+        if month != self.month:
+            self.close()
+            self.open(month)
+        for name, kind in self.columns.items():
+            self.buffer[name].append(self.convert(kind, row.get(name)))
+        self.rows += 1
+        if len(self.buffer[self.key]) >= EXPORT_ROW_GROUP:
+            self.flush()
+    
+    def open(self, month: str):
+        path = self.partition_path(month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.month = month
+        self.writer = self.pq.ParquetWriter(f"{path}.tmp", self.schema, compression='zstd')
+        self.buffer = {name: [] for name in self.columns}
+        self.months.append(month)
+    
+    def flush(self):
+        if self.writer and self.buffer[self.key]:
+            self.writer.write_table(self.pa.Table.from_pydict(self.buffer, schema=self.schema))
+            self.buffer = {name: [] for name in self.columns}
+    
+    def close(self):
+        if not self.writer:
+            return
+        self.flush()
+        self.writer.close()
+        path = self.partition_path(self.month)
+        os.replace(f"{path}.tmp", path)
+        self.writer = None
+
+
+def archived_months(table_dir: str) -> List[str]:
+    """Month partitions already exported for a table, oldest first"""
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(
+        name.partition('=')[2] for name in os.listdir(table_dir)
+        if name.startswith('month=') and os.path.exists(os.path.join(table_dir, name, 'part.parquet'))
+    )
+
+
+async def export_archive(out_dir: str = EXPORT_DIR, full: bool = False) -> Dict[str, int]:
+    """Stream the collar tables into month-partitioned Parquet under out_dir
+
+    Each table resumes at its newest exported month, which is rewritten
+    since it may still be growing; older months are left alone. `full`
+    rewrites every partition, e.g. after a backfill of old history.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("ERROR: pyarrow not installed. Run: pip install pyarrow")
+        sys.exit(1)
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in .env.local")
+    
+    supabase = AsyncSupabaseClient(SUPABASE_URL, SUPABASE_ANON_KEY)
+    exported = {}
+    try:
+        for table, (key, columns) in EXPORT_TABLES.items():
+            started = time.perf_counter()
+            table_dir = os.path.join(out_dir, table)
+            months = [] if full else archived_months(table_dir)
+            params = {}
+            if months:
+                since = f"{months[-1]}-01"
+                params[key] = f"gte.{since}T00:00:00+00:00" if columns[key] == 'timestamp' else f"gte.{since}"
+            
+            print(f"🗃️  {table}: " + (f"from {months[-1]}" if months else "full export"))
+            writer = ArchiveWriter(pa, pq, table_dir, key, columns)
+            try:
+                async for row in supabase.iter_select(table, (key, 'id'), list(columns), params,
+                                                      page_size=EXPORT_PAGE_SIZE):
+                    writer.add(row)
+            finally:
+                writer.close()
+            
+            exported[table] = writer.rows
+            span = f", {writer.months[0]}..{writer.months[-1]}" if writer.months else ''
+            print(f"  ✅ {writer.rows} rows in {len(writer.months)} partition(s){span}"
+                  f" ({time.perf_counter() - started:.1f}s)")
+    finally:
+        await supabase.close()
+    
+    print(f"📁 Archive: {os.path.abspath(out_dir)}")
+    return exported
 
 
 def main():
@@ -362,10 +2959,24 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Sync Bailey Fi collar data to Supabase')
-    parser.add_argument('--type', choices=['manual', 'auto', 'cron'], default='manual',
-                       help='Sync type for logging')
+    parser.add_argument('command', nargs='?', default='sync', choices=['sync', 'export'],
+                       help='sync (default), or export the collar tables to a local Parquet archive')
+    parser.add_argument('--type', choices=['manual', 'auto', 'cron'],
+                       help='Sync type for logging (default: manual, or auto with --daemon)')
     parser.add_argument('--days', type=int, help='Number of days to sync (overrides env)')
     parser.add_argument('--dry-run', action='store_true', help='Run without saving to database')
+    parser.add_argument('--full', action='store_true',
+                       help='Ignore watermarks and resync the whole --days window (export: rewrite every partition)')
+    parser.add_argument('--batch-size', type=int, help='Rows per bulk write (overrides env)')
+    parser.add_argument('--concurrency', type=int, help='Max parallel chunk writes (overrides env)')
+    parser.add_argument('--daemon', action='store_true', help='Stay running and sync every --interval minutes')
+    parser.add_argument('--interval', type=float, help='Minutes between daemon syncs (overrides env)')
+    parser.add_argument('--backfill', metavar='START..END',
+                       help='Backfill a date range (YYYY-MM-DD..YYYY-MM-DD) in resumable shards')
+    parser.add_argument('--shard-days', type=int, help='Days per backfill shard (overrides env)')
+    parser.add_argument('--rebuild-rollups', metavar='START..END',
+                       help='Recompute the weekly/monthly rollups for a date range without fetching from Fi')
+    parser.add_argument('--export-dir', help='Parquet archive directory for export (overrides env)')
     
     args = parser.parse_args()
     
@@ -378,9 +2989,49 @@ def main():
         global DRY_RUN
         DRY_RUN = True
     
+    if args.batch_size:
+        global BATCH_SIZE
+        BATCH_SIZE = args.batch_size
+    
+    if args.concurrency:
+        global CONCURRENCY
+        CONCURRENCY = args.concurrency
+    
+    if args.backfill:
+        if args.daemon:
+            parser.error('--backfill and --daemon cannot be combined')
+        try:
+            parse_backfill_range(args.backfill)
+        except ValueError as e:
+            parser.error(str(e))
+        ok = run_backfill(args.backfill, args.shard_days or BACKFILL_SHARD_DAYS)
+        sys.exit(0 if ok else 1)
+    
+    if args.command == 'export':
+        asyncio.run(export_archive(args.export_dir or EXPORT_DIR, full=args.full))
+        sys.exit(0)
+    
+    if args.rebuild_rollups:
+        try:
+            start, end = parse_backfill_range(args.rebuild_rollups)
+        except ValueError as e:
+            parser.error(str(e))
+        rebuild_rollups(start, end)
+        sys.exit(0)
+    
     # Run sync
-    syncer = FiSync()
-    asyncio.run(syncer.run_sync(sync_type=args.type))
+    async def run():
+        syncer = FiSync()
+        try:
+            if args.daemon:
+                interval = args.interval or SYNC_INTERVAL_MINUTES
+                await syncer.run_daemon(interval, sync_type=args.type or 'auto', full=args.full)
+            else:
+                await syncer.run_sync(sync_type=args.type or 'manual', full=args.full)
+        finally:
+            await syncer.close()
+    
+    asyncio.run(run())
 
 
 if __name__ == '__main__':
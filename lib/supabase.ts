@@ -43,6 +43,7 @@ export type Walk = {
   end_time?: string | null;
   avg_speed_mph?: number | null;
   synced_from_fi?: boolean;
+  path_polyline?: string | null; // Encoded polyline of the simplified GPS track
 };
 
 export type HealthRecord = {
@@ -61,6 +62,17 @@ export type Photo = {
   caption: string | null;
   date: string;
   is_favorite: boolean;
+  content_hash?: string | null; // Set by photo-import.py
+  storage_path?: string | null;
+  width?: number | null; // Variant columns are set by photo-variants.py
+  height?: number | null;
+  thumb_url?: string | null;
+  thumb_width?: number | null;
+  thumb_height?: number | null;
+  medium_url?: string | null;
+  medium_width?: number | null;
+  medium_height?: number | null;
+  webp_url?: string | null;
   created_at: string;
 };
 
@@ -112,15 +124,78 @@ export type FiSleep = {
   created_at: string;
 };
 
+// Weekly (Monday start) or monthly totals, maintained by fi-sync.py
+export type FiActivityRollup = {
+  id: string;
+  period: 'week' | 'month';
+  period_start: string;
+  period_end: string;
+  days_tracked: number;
+  total_steps: number;
+  avg_steps: number;
+  total_distance_meters: number;
+  avg_distance_meters: number;
+  total_calories: number;
+  total_walks: number;
+  active_minutes: number;
+  play_minutes: number;
+  goal_days: number;
+  goal_hit_rate: number; // 0..1
+  rest_minutes: number;
+  nap_minutes: number;
+  deep_sleep_minutes: number;
+  sleep_days: number;
+  avg_sleep_minutes: number;
+  updated_at: string;
+};
+
+// Latest collar state, published by fi-sync.py each tick (or by /api/fi/sync on a live fetch)
+export type FiSnapshot = {
+  pet_id: string;
+  name: string | null;
+  breed: string | null;
+  weight: number | null;
+  photo_url: string | null;
+  steps: number;
+  daily_goal: number | null;
+  distance_meters: number;
+  weekly_steps: number;
+  weekly_distance_meters: number;
+  activity_type: string | null;
+  activity_start: string | null;
+  activity_steps: number;
+  location: string | null;
+  latitude: number | null;
+  longitude: number | null;
+  connection_type: string | null;
+  connection_date: string | null;
+  signal_strength_percent: number | null;
+  led_color: string | null;
+  led_hex: string | null;
+  source: 'sync' | 'route';
+  fetched_at: string;
+};
+
 export type FiSyncLog = {
   id: string;
   sync_type: 'manual' | 'auto' | 'cron';
   started_at: string;
   completed_at: string | null;
-  status: 'running' | 'success' | 'failed';
+  status: 'running' | 'success' | 'partial' | 'failed';
   records_synced: number;
   error_message: string | null;
   created_at: string;
+  // Per-stage timings (stage times are summed across days; write_ms across parallel chunks)
+  duration_ms?: number | null;
+  connect_ms?: number | null;
+  activity_ms?: number | null;
+  walks_ms?: number | null;
+  sleep_ms?: number | null;
+  write_ms?: number | null;
+  locations_ms?: number | null;
+  request_count?: number | null;
+  bytes_sent?: number | null;
+  retry_count?: number | null;
 };
 
 // Veterinary Records
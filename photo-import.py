@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Bailey Dashboard - Bulk Photo Import
+Upload a directory of photos to the bailey-photos bucket and add their bailey_photos rows
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    print("ERROR: python-dotenv not installed. Run: pip install python-dotenv")
+    sys.exit(1)
+
+try:
+    import requests
+except ImportError:
+    print("ERROR: requests not installed. Run: pip install requests")
+    sys.exit(1)
+
+# Pillow is optional here: it only reads EXIF capture dates (file mtime otherwise)
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Load environment variables
+load_dotenv('.env.local')
+
+SUPABASE_URL = (os.getenv('NEXT_PUBLIC_SUPABASE_URL') or '').rstrip('/')
+# The service role key bypasses storage policies; the anon key works with the public bucket policies
+SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY')
+
+BUCKET = 'bailey-photos'
+IMPORT_PREFIX = 'imports'  # Objects go to imports/<hash[:2]>/<hash>.<ext>
+IMPORT_WORKERS = int(os.getenv('PHOTO_IMPORT_WORKERS', '8'))
+IMPORT_STATE = os.getenv('PHOTO_IMPORT_STATE', '.photo-import.json')  # Unfinished resumable uploads
+
+MAX_FILE_SIZE = 50 * 1024 * 1024  # Bucket file_size_limit (create-bucket-now.py)
+TUS_CHUNK_SIZE = 6 * 1024 * 1024  # Supabase's resumable endpoint takes exactly 6 MB chunks
+INSERT_BATCH = 100
+PAGE_SIZE = 1000
+
+# Same types the bucket allows
+CONTENT_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.heic': 'image/heic',
+    '.heif': 'image/heif'
+}
+
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+EXIF_IFD = 0x8769
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of the file contents, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def photo_date(path: str) -> str:
+    """Capture date from EXIF when Pillow can read it, else the file's mtime"""
+    if PIL_AVAILABLE:
+        try:
+            with Image.open(path) as image:
+                exif = image.getexif()
+                taken = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+            if taken:
+                return datetime.strptime(str(taken).strip()[:10], '%Y:%m:%d').strftime('%Y-%m-%d')
+        except (OSError, ValueError):
+            pass  # Not readable by Pillow (e.g. HEIC without a plugin) or a malformed tag
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d')
+
+
+def scan(directory: str) -> List[str]:
+    """Image files under directory, in a stable order"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.startswith('.') and os.path.splitext(name)[1].lower() in CONTENT_TYPES:
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def object_name(digest: str, path: str) -> str:
+    """Content-addressed storage path, so a re-upload of the same photo is a no-op"""
+    ext = os.path.splitext(path)[1].lower()
+    return f"{IMPORT_PREFIX}/{digest[:2]}/{digest}{ext}"
+
+
+def public_url(name: str) -> str:
+    return f"{SUPABASE_URL}/storage/v1/object/public/{BUCKET}/{name}"
+
+
+class UploadState:
+    """Upload URLs of unfinished resumable uploads, kept so a rerun continues them"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.uploads: Dict[str, str] = json.load(f)
+        except (OSError, ValueError):
+            self.uploads = {}
+
+    def get(self, digest: str) -> Optional[str]:
+        with self.lock:
+            return self.uploads.get(digest)
+
+    def set(self, digest: str, url: Optional[str]):
+        with self.lock:
+            if url:
+                self.uploads[digest] = url
+            else:
+                self.uploads.pop(digest, None)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.uploads, f, indent=2)
+            os.replace(tmp, self.path)
+
+
+class StorageUploader:
+    """Uploads files to the bucket; large ones through the resumable (TUS) endpoint
+
+    Each worker thread gets its own requests.Session, so connections are
+    reused per thread without sharing a session across threads.
+    """
+
+    def __init__(self, state: UploadState):
+        self.state = state
+        self.local = threading.local()
+        self.headers = {'apikey': SUPABASE_KEY, 'Authorization': f'Bearer {SUPABASE_KEY}'}
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update(self.headers)
+        return self.local.session
+
+    @staticmethod
+    def already_exists(resp: requests.Response) -> bool:
+        """Storage answers a duplicate object with 409, or 400 carrying a 409 body"""
+        if resp.status_code == 409:
+            return True
+        return resp.status_code == 400 and ('Duplicate' in resp.text or '"409"' in resp.text)
+
+    def upload(self, path: str, name: str, content_type: str, digest: str):
+        """Put one file at `name`; an object already there counts as uploaded"""
+        if os.path.getsize(path) <= TUS_CHUNK_SIZE:
+            with open(path, 'rb') as f:
+                resp = self.session.post(
+                    f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{name}",
+                    data=f.read(),
+                    headers={'Content-Type': content_type, 'Cache-Control': 'max-age=3600', 'x-upsert': 'false'},
+                    timeout=120
+                )
+            if not self.already_exists(resp):
+                resp.raise_for_status()
+            return
+        self.upload_resumable(path, name, content_type, digest)
+
+    def upload_resumable(self, path: str, name: str, content_type: str, digest: str):
+        """TUS upload in 6 MB chunks, continuing an interrupted one if the server still has it"""
+        size = os.path.getsize(path)
+        base = {'Tus-Resumable': '1.0.0'}
+        url, offset = self.state.get(digest), 0
+
+        if url:
+            resp = self.session.head(url, headers=base, timeout=30)
+            if resp.ok:
+                offset = int(resp.headers.get('Upload-Offset', 0))
+                print(f"  ↪️  Resuming {os.path.basename(path)} at {offset / size:.0%}")
+            else:
+                url = None  # Expired on the server; start over
+
+        if not url:
+            metadata = {'bucketName': BUCKET, 'objectName': name, 'contentType': content_type,
+                        'cacheControl': '3600'}
+            resp = self.session.post(
+                f"{SUPABASE_URL}/storage/v1/upload/resumable",
+                headers={
+                    **base,
+                    'Upload-Length': str(size),
+                    'Upload-Metadata': ','.join(
+                        f"{key} {base64_value(value)}" for key, value in metadata.items()
+                    ),
+                    'x-upsert': 'false'
+                },
+                timeout=30
+            )
+            if self.already_exists(resp):
+                return
+            resp.raise_for_status()
+            url = requests.compat.urljoin(resp.url, resp.headers['Location'])
+            self.state.set(digest, url)
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while offset < size:
+                chunk = f.read(TUS_CHUNK_SIZE)
+                resp = self.session.patch(
+                    url,
+                    data=chunk,
+                    headers={**base, 'Upload-Offset': str(offset),
+                             'Content-Type': 'application/offset+octet-stream'},
+                    timeout=120
+                )
+                if self.already_exists(resp):
+                    break
+                resp.raise_for_status()
+                offset = int(resp.headers.get('Upload-Offset', offset + len(chunk)))
+
+        self.state.set(digest, None)
+
+
+def base64_value(value: str) -> str:
+    """Upload-Metadata values are base64 encoded"""
+    return base64.b64encode(value.encode()).decode()
+
+
+def existing_hashes(session: requests.Session) -> set:
+    """content_hash of every bailey_photos row, paged by the hash itself"""
+    hashes, last = set(), None
+    while True:
+        params = {
+            'select': 'content_hash',
+            'content_hash': f'gt.{last}' if last else 'not.is.null',
+            'order': 'content_hash.asc',
+            'limit': str(PAGE_SIZE)
+        }
+        resp = session.get(f"{SUPABASE_URL}/rest/v1/bailey_photos", params=params, timeout=30)
+        resp.raise_for_status()
+        page = resp.json()
+        # A short page isn't the end: PostgREST's max-rows can cap it below PAGE_SIZE
+        if not page:
+            return hashes
+        hashes.update(row['content_hash'] for row in page)
+        last = page[-1]['content_hash']
+
+
+def insert_rows(session: requests.Session, rows: List[Dict[str, Any]]):
+    """One bulk insert; rows whose content_hash is already stored are ignored"""
+    resp = session.post(
+        f"{SUPABASE_URL}/rest/v1/bailey_photos",
+        params={'on_conflict': 'content_hash'},
+        json=rows,
+        headers={'Prefer': 'resolution=ignore-duplicates,return=minimal'},
+        timeout=30
+    )
+    resp.raise_for_status()
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bulk-import a directory of photos into the gallery')
+    parser.add_argument('directory', help='Directory to import (searched recursively)')
+    parser.add_argument('--caption', help='Caption for every imported photo')
+    parser.add_argument('--date', help='Date (YYYY-MM-DD) for every photo instead of the EXIF/file date')
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS, help='Parallel uploads (overrides env)')
+    parser.add_argument('--dry-run', action='store_true', help='Hash and report without uploading')
+    args = parser.parse_args()
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print("❌ Missing Supabase credentials in .env.local")
+        sys.exit(1)
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+    if args.date:
+        try:
+            datetime.strptime(args.date, '%Y-%m-%d')
+        except ValueError:
+            parser.error(f"--date must be YYYY-MM-DD, got {args.date!r}")
+
+    session = requests.Session()
+    session.headers.update({
+        'apikey': SUPABASE_KEY,
+        'Authorization': f'Bearer {SUPABASE_KEY}',
+        'Content-Type': 'application/json'
+    })
+
+    paths = scan(args.directory)
+    print(f"📷 {len(paths)} photos in {args.directory}")
+    if not paths:
+        return
+    known = existing_hashes(session)
+    print(f"🗂️  {len(known)} photos already imported")
+
+    uploader = StorageUploader(UploadState(IMPORT_STATE))
+    claimed_lock = threading.Lock()
+
+    def import_one(path: str) -> Optional[Dict[str, Any]]:
+        """Hash, skip or upload one file; returns its bailey_photos row, or None if skipped"""
+        size = os.path.getsize(path)
+        if size > MAX_FILE_SIZE:
+            raise ValueError(f"{size / 1048576:.0f} MB is over the bucket's 50 MB limit")
+        digest = file_hash(path)
+        with claimed_lock:
+            # Also skips a second copy of the same photo within this import
+            if digest in known:
+                return None
+            known.add(digest)
+
+        name = object_name(digest, path)
+        if not args.dry_run:
+            uploader.upload(path, name, CONTENT_TYPES[os.path.splitext(path)[1].lower()], digest)
+        return {
+            'url': public_url(name),
+            'caption': args.caption,
+            'date': args.date or photo_date(path),
+            'content_hash': digest,
+            'storage_path': name,
+            '_bytes': size
+        }
+
+    started = time.perf_counter()
+    batch: List[Dict[str, Any]] = []
+    uploaded = skipped = failed = inserted = 0
+    uploaded_bytes = 0
+
+    def save(rows: List[Dict[str, Any]]):
+        """Insert one batch of rows; a failed batch counts as failed photos and the import goes on"""
+        nonlocal inserted, failed
+        try:
+            insert_rows(session, rows)
+        except requests.RequestException as e:
+            failed += len(rows)
+            # The files are uploaded already; a rerun finds them in the bucket and only adds the rows
+            print(f"  ❌ Could not add {len(rows)} bailey_photos rows: {e}")
+            return
+        inserted += len(rows)
+
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        futures = {pool.submit(import_one, path): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"  ❌ [{done}/{len(paths)}] {path}: {e}")
+                continue
+            if row is None:
+                skipped += 1
+                continue
+
+            uploaded += 1
+            uploaded_bytes += row.pop('_bytes')
+            verb = 'Would upload' if args.dry_run else 'Uploaded'
+            print(f"  ✅ [{done}/{len(paths)}] {verb} {os.path.relpath(path, args.directory)} → {row['storage_path']}")
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH and not args.dry_run:
+                save(batch)
+                batch = []
+
+    if batch and not args.dry_run:
+        save(batch)
+
+    elapsed = time.perf_counter() - started
+    mb = uploaded_bytes / 1048576
+    print("\n" + "=" * 60)
+    print(f"{'⚠️  IMPORT INCOMPLETE' if failed else '✅ IMPORT COMPLETE'}: "
+          f"{uploaded} uploaded ({mb:.1f} MB, {mb / elapsed:.1f} MB/s), {skipped} already there, {failed} failed")
+    if args.dry_run:
+        print("⚠️  DRY RUN MODE - Nothing was uploaded")
+    else:
+        print(f"🖼️  {inserted} bailey_photos rows added in {elapsed:.1f}s")
+        if inserted:
+            print("💡 Run photo-variants.py to generate their gallery thumbnails")
+    if failed:
+        print("🔁 Run the same import again to retry; finished photos are skipped")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Bailey Dashboard - Photo Variants
+Generate thumbnail, medium and WebP versions of new gallery photos so the grid doesn't load originals
+"""
+
+import os
+import sys
+import io
+import time
+from datetime import datetime, timezone
+from urllib.parse import unquote, urlparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List, Tuple
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    print("ERROR: python-dotenv not installed. Run: pip install python-dotenv")
+    sys.exit(1)
+
+try:
+    import requests
+except ImportError:
+    print("ERROR: requests not installed. Run: pip install requests")
+    sys.exit(1)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    print("ERROR: Pillow not installed. Run: pip install pillow")
+    sys.exit(1)
+
+# HEIC/HEIF originals (iPhone) need the pillow-heif plugin; without it those rows are marked failed
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+# Load environment variables
+load_dotenv('.env.local')
+
+SUPABASE_URL = (os.getenv('NEXT_PUBLIC_SUPABASE_URL') or '').rstrip('/')
+SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY')
+
+BUCKET = 'bailey-photos'
+PUBLIC_PREFIX = f'/storage/v1/object/public/{BUCKET}/'
+VARIANT_WORKERS = int(os.getenv('PHOTO_VARIANT_WORKERS', '0')) or os.cpu_count() or 2
+UPDATE_BATCH = 50
+PAGE_SIZE = 1000
+
+THUMB_SIZE = 640    # Long edge; grid cells are ~320px CSS, so this covers 2x screens
+MEDIUM_SIZE = 1600  # Long edge; lightbox is max-w-4xl
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+VARIANT_COLUMNS = [
+    'width', 'height',
+    'thumb_url', 'thumb_width', 'thumb_height',
+    'medium_url', 'medium_width', 'medium_height',
+    'webp_url', 'variants_at', 'variant_error'
+]
+# A failed photo only records the attempt, so a --redo or --retry-failed run can't wipe its good variants
+FAILURE_COLUMNS = ['variants_at', 'variant_error']
+
+_session: Optional[requests.Session] = None
+
+
+def worker_session() -> requests.Session:
+    """One session per pool process (sessions don't survive a fork safely)"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update({'apikey': SUPABASE_KEY, 'Authorization': f'Bearer {SUPABASE_KEY}'})
+    return _session
+
+
+def variant_base(row: Dict[str, Any]) -> str:
+    """Bucket path the variants are named after: the original's path without its extension
+
+    Rows from the web uploader only have a public URL; photos added by URL
+    from elsewhere get their variants under external/.
+    """
+    path = row.get('storage_path')
+    if not path:
+        url = urlparse(row['url'])
+        if url.path.startswith(PUBLIC_PREFIX) and row['url'].startswith(SUPABASE_URL):
+            path = unquote(url.path[len(PUBLIC_PREFIX):])
+    if not path:
+        return f"external/{row['id']}"
+    return os.path.splitext(path)[0]
+
+
+def flatten(image: Image.Image) -> Image.Image:
+    """RGB for JPEG output; transparent pixels go on white"""
+    if image.mode == 'RGB':
+        return image
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_variants(data: bytes) -> Tuple[Tuple[int, int], Dict[str, Tuple[bytes, int, int]]]:
+    """Decode once and encode every variant; returns the upright original size and {name: (bytes, w, h)}"""
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):  # Orientation tags that rotate by 90°
+            width, height = height, width
+
+        # Let the JPEG decoder downscale by 1/2..1/8 while decoding; nothing needs more than MEDIUM_SIZE
+        scale = MEDIUM_SIZE / max(image.size)
+        if scale < 1:
+            image.draft('RGB', (int(image.size[0] * scale) + 1, int(image.size[1] * scale) + 1))
+        image.seek(0)  # First frame of animated GIF/WebP
+        upright = ImageOps.exif_transpose(image)
+
+    medium = upright.copy()
+    medium.thumbnail((MEDIUM_SIZE, MEDIUM_SIZE), Image.LANCZOS)
+    thumb = medium.copy()
+    thumb.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.LANCZOS)
+
+    variants = {}
+    for name, image, fmt, options in (
+        ('thumb', flatten(thumb), 'JPEG', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+        ('medium', flatten(medium), 'JPEG', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+        ('webp', medium if medium.mode in ('RGB', 'RGBA') else medium.convert('RGBA'), 'WEBP',
+         {'quality': WEBP_QUALITY, 'method': 4})
+    ):
+        out = io.BytesIO()
+        image.save(out, fmt, **options)  # No exif= argument, so GPS and camera tags are dropped
+        variants[name] = (out.getvalue(), image.size[0], image.size[1])
+    return (width, height), variants
+
+
+def process_photo(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Pool worker: download the original, render, upload; returns the row's variant columns"""
+    session = worker_session()
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        resp = session.get(row['url'], timeout=120)
+        resp.raise_for_status()
+        original = resp.content
+        (width, height), variants = render_variants(original)
+
+        base = variant_base(row)
+        update = {'width': width, 'height': height, 'variants_at': now, 'variant_error': None}
+        for name, (data, w, h) in variants.items():
+            path = f"{base}_medium.webp" if name == 'webp' else f"{base}_{name}.jpg"
+            resp = session.post(
+                f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{path}",
+                data=data,
+                headers={
+                    'Content-Type': 'image/webp' if name == 'webp' else 'image/jpeg',
+                    'Cache-Control': 'max-age=3600',
+                    'x-upsert': 'true'  # A regenerated variant replaces the old one
+                },
+                timeout=120
+            )
+            resp.raise_for_status()
+            update[f'{name}_url'] = f"{SUPABASE_URL}{PUBLIC_PREFIX}{path}"
+            if name != 'webp':  # The WebP copy is the medium size
+                update[f'{name}_width'], update[f'{name}_height'] = w, h
+        update['_bytes'] = (len(original), sum(len(v[0]) for v in variants.values()))
+        return update
+    except Exception as e:
+        # Recorded so a bad file isn't retried every run; --retry-failed picks these up again
+        return {'variants_at': now, 'variant_error': f"{type(e).__name__}: {e}"[:500]}
+
+
+def pending_photos(session: requests.Session, redo: bool, retry_failed: bool) -> List[Dict[str, Any]]:
+    """Photos still needing variants, paged by id"""
+    rows, last = [], None
+    while True:
+        params = {'select': 'id,url,date,storage_path', 'order': 'id.asc', 'limit': str(PAGE_SIZE)}
+        if retry_failed and not redo:
+            params['or'] = '(variants_at.is.null,variant_error.not.is.null)'
+        elif not redo:
+            params['variants_at'] = 'is.null'
+        if last:
+            params['id'] = f'gt.{last}'
+        resp = session.get(f"{SUPABASE_URL}/rest/v1/bailey_photos", params=params, timeout=30)
+        resp.raise_for_status()
+        page = resp.json()
+        # A short page isn't the end: PostgREST's max-rows can cap it below PAGE_SIZE
+        if not page:
+            return rows
+        rows.extend(page)
+        last = page[-1]['id']
+
+
+def save_updates(session: requests.Session, updates: List[Dict[str, Any]], columns: List[str]):
+    """Write `columns` for a batch of rows in one upsert on id
+
+    url and date ride along because they're NOT NULL; every row carries the
+    same keys, as PostgREST requires for a bulk upsert, and columns left out
+    keep their stored values.
+    """
+    rows = [{key: row.get(key) for key in ('id', 'url', 'date', *columns)} for row in updates]
+    resp = session.post(
+        f"{SUPABASE_URL}/rest/v1/bailey_photos",
+        params={'on_conflict': 'id', 'columns': ','.join(rows[0])},
+        json=rows,
+        headers={'Prefer': 'resolution=merge-duplicates,return=minimal'},
+        timeout=30
+    )
+    resp.raise_for_status()
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate thumbnail/medium/WebP variants for gallery photos')
+    parser.add_argument('--workers', type=int, default=VARIANT_WORKERS, help='Worker processes (overrides env)')
+    parser.add_argument('--limit', type=int, help='Process at most this many photos')
+    parser.add_argument('--retry-failed', action='store_true', help='Also retry photos that failed before')
+    parser.add_argument('--redo', action='store_true', help='Regenerate variants for every photo')
+    args = parser.parse_args()
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print("❌ Missing Supabase credentials in .env.local")
+        sys.exit(1)
+
+    session = requests.Session()
+    session.headers.update({
+        'apikey': SUPABASE_KEY,
+        'Authorization': f'Bearer {SUPABASE_KEY}',
+        'Content-Type': 'application/json'
+    })
+
+    rows = pending_photos(session, args.redo, args.retry_failed)
+    if args.limit:
+        rows = rows[:args.limit]
+    print(f"🖼️  {len(rows)} photos need variants")
+    if not rows:
+        return
+
+    started = time.perf_counter()
+    batches: Dict[str, List[Dict[str, Any]]] = {'done': [], 'failed': []}
+    batch_columns = {'done': VARIANT_COLUMNS, 'failed': FAILURE_COLUMNS}
+    done = failed = 0
+    original_bytes = variant_bytes = 0
+
+    def save(outcome: str):
+        """Write one batch of updates; a failed batch counts as failed photos and the run goes on"""
+        nonlocal done, failed
+        batch, batches[outcome] = batches[outcome], []
+        try:
+            save_updates(session, batch, batch_columns[outcome])
+        except requests.RequestException as e:
+            if outcome == 'done':
+                done -= len(batch)
+                failed += len(batch)
+            # Nothing was recorded for these photos, so the next run picks them up again
+            print(f"  ❌ Could not save {len(batch)} bailey_photos updates: {e}")
+
+    with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        futures = {pool.submit(process_photo, row): row for row in rows}
+        for count, future in enumerate(as_completed(futures), 1):
+            row = futures[future]
+            update = future.result()
+            outcome = 'failed' if update.get('variant_error') else 'done'
+            if outcome == 'failed':
+                failed += 1
+                print(f"  ❌ [{count}/{len(rows)}] {row['url']}: {update['variant_error']}")
+            else:
+                done += 1
+                original, variants = update.pop('_bytes')
+                original_bytes += original
+                variant_bytes += variants
+                print(f"  ✅ [{count}/{len(rows)}] {update['width']}x{update['height']} → "
+                      f"thumb {update['thumb_width']}x{update['thumb_height']} ({update['thumb_url'].rsplit('/', 1)[-1]})")
+            batches[outcome].append({**row, **update})
+            if len(batches[outcome]) >= UPDATE_BATCH:
+                save(outcome)
+
+    for outcome in batches:
+        if batches[outcome]:
+            save(outcome)
+
+    elapsed = time.perf_counter() - started
+    print("\n" + "=" * 60)
+    print(f"{'⚠️  VARIANTS INCOMPLETE' if failed else '✅ VARIANTS COMPLETE'}: "
+          f"{done} photos in {elapsed:.1f}s, {failed} failed")
+    if done:
+        print(f"📉 Originals {original_bytes / 1048576:.1f} MB → variants {variant_bytes / 1048576:.1f} MB")
+    if failed:
+        print("🔁 Failed photos are skipped next run; use --retry-failed to try them again")
+
+
+if __name__ == '__main__':
+    main()
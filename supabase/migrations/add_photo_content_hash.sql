@@ -0,0 +1,11 @@
+-- Bailey Photo Content Hash Migration
+-- Lets photo-import.py skip photos that are already in the gallery, whatever their file name
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS content_hash TEXT; -- SHA-256 of the original file
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS storage_path TEXT; -- Object path in the bailey-photos bucket
+
+-- Photos added from the web uploader keep a NULL hash; only imported ones are deduplicated
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bailey_photos_content_hash ON bailey_photos(content_hash);
+
+COMMENT ON COLUMN bailey_photos.content_hash IS 'SHA-256 of the uploaded file, set by photo-import.py';
@@ -0,0 +1,20 @@
+-- Bailey Photo Variants Migration
+-- Resized copies written by photo-variants.py, so the gallery grid loads thumbnails instead of originals
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS width INTEGER; -- Original, after EXIF orientation
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS height INTEGER;
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS thumb_url TEXT; -- JPEG, 640px long edge
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS thumb_width INTEGER;
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS thumb_height INTEGER;
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS medium_url TEXT; -- JPEG, 1600px long edge
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS medium_width INTEGER;
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS medium_height INTEGER;
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS webp_url TEXT; -- WebP of the medium size
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS variants_at TIMESTAMPTZ; -- NULL until processed
+ALTER TABLE bailey_photos ADD COLUMN IF NOT EXISTS variant_error TEXT; -- Set when the original couldn't be processed
+
+-- The worker's queue: rows without variants yet
+CREATE INDEX IF NOT EXISTS idx_bailey_photos_pending_variants ON bailey_photos(id) WHERE variants_at IS NULL;
+
+COMMENT ON COLUMN bailey_photos.thumb_url IS 'Grid-sized JPEG written by photo-variants.py; the gallery falls back to url when NULL';
@@ -0,0 +1,21 @@
+-- Bailey Fi Sync Log Timings Migration
+-- Per-stage timings and request totals for each fi-sync.py run, for charting sync performance
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+ALTER TABLE bailey_fi_sync_log
+ADD COLUMN IF NOT EXISTS duration_ms INTEGER,
+ADD COLUMN IF NOT EXISTS connect_ms INTEGER,
+ADD COLUMN IF NOT EXISTS activity_ms INTEGER,
+ADD COLUMN IF NOT EXISTS walks_ms INTEGER,
+ADD COLUMN IF NOT EXISTS sleep_ms INTEGER,
+ADD COLUMN IF NOT EXISTS write_ms INTEGER,
+ADD COLUMN IF NOT EXISTS locations_ms INTEGER,
+ADD COLUMN IF NOT EXISTS request_count INTEGER,
+ADD COLUMN IF NOT EXISTS bytes_sent BIGINT,
+ADD COLUMN IF NOT EXISTS retry_count INTEGER;
+
+COMMENT ON COLUMN bailey_fi_sync_log.duration_ms IS 'Wall time of the whole run';
+COMMENT ON COLUMN bailey_fi_sync_log.activity_ms IS 'Activity stage time, summed across the days of the window';
+COMMENT ON COLUMN bailey_fi_sync_log.write_ms IS 'Bulk write time, summed across parallel chunks';
+
+CREATE INDEX IF NOT EXISTS idx_fi_sync_log_started ON bailey_fi_sync_log(started_at DESC);
@@ -0,0 +1,8 @@
+-- Bailey Walk Path Migration
+-- Simplified GPS track per walk as a Google encoded polyline (set FI_STORE_POLYLINE=true)
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+ALTER TABLE bailey_walks
+ADD COLUMN IF NOT EXISTS path_polyline TEXT;
+
+COMMENT ON COLUMN bailey_walks.path_polyline IS 'Simplified walk track, Google encoded polyline (precision 5)';
@@ -0,0 +1,37 @@
+-- Bailey Fi Activity Rollups Migration
+-- Weekly (Monday start) and monthly totals maintained by fi-sync.py, so the dashboard reads a few rows instead of every day
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+CREATE TABLE IF NOT EXISTS bailey_fi_activity_rollups (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  period TEXT NOT NULL CHECK (period IN ('week', 'month')),
+  period_start DATE NOT NULL,
+  period_end DATE NOT NULL,
+  days_tracked INTEGER NOT NULL DEFAULT 0, -- Days with an activity row
+  total_steps BIGINT NOT NULL DEFAULT 0,
+  avg_steps INTEGER NOT NULL DEFAULT 0, -- Per tracked day
+  total_distance_meters NUMERIC NOT NULL DEFAULT 0,
+  avg_distance_meters NUMERIC NOT NULL DEFAULT 0,
+  total_calories INTEGER NOT NULL DEFAULT 0,
+  total_walks INTEGER NOT NULL DEFAULT 0,
+  active_minutes INTEGER NOT NULL DEFAULT 0,
+  play_minutes INTEGER NOT NULL DEFAULT 0,
+  goal_days INTEGER NOT NULL DEFAULT 0,
+  goal_hit_rate NUMERIC(5, 4) NOT NULL DEFAULT 0, -- goal_days / days_tracked
+  rest_minutes INTEGER NOT NULL DEFAULT 0, -- From bailey_fi_sleep, by sleep_type
+  nap_minutes INTEGER NOT NULL DEFAULT 0,
+  deep_sleep_minutes INTEGER NOT NULL DEFAULT 0,
+  sleep_days INTEGER NOT NULL DEFAULT 0, -- Days with any sleep row
+  avg_sleep_minutes INTEGER NOT NULL DEFAULT 0, -- Per day with sleep
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (period, period_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_fi_activity_rollups_start ON bailey_fi_activity_rollups(period, period_start DESC);
+
+ALTER TABLE bailey_fi_activity_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Allow public read/write for now (tighten later)
+CREATE POLICY "Allow all" ON bailey_fi_activity_rollups FOR ALL USING (true) WITH CHECK (true);
+
+COMMENT ON TABLE bailey_fi_activity_rollups IS 'Fi activity/sleep rollups per week and month, recomputed by fi-sync.py for the periods each run touches';
@@ -0,0 +1,36 @@
+-- Bailey Fi Snapshot Migration
+-- Latest collar state per pet, published by fi-sync.py after each tick; /api/fi/sync serves it while fresh
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+CREATE TABLE IF NOT EXISTS bailey_fi_snapshot (
+  pet_id TEXT PRIMARY KEY,
+  name TEXT,
+  breed TEXT,
+  weight NUMERIC,
+  photo_url TEXT,
+  steps INTEGER NOT NULL DEFAULT 0, -- Today so far
+  daily_goal INTEGER,
+  distance_meters NUMERIC NOT NULL DEFAULT 0,
+  weekly_steps INTEGER NOT NULL DEFAULT 0,
+  weekly_distance_meters NUMERIC NOT NULL DEFAULT 0,
+  activity_type TEXT, -- OngoingWalk / OngoingRest
+  activity_start TIMESTAMPTZ,
+  activity_steps INTEGER NOT NULL DEFAULT 0,
+  location TEXT,
+  latitude NUMERIC(10,8),
+  longitude NUMERIC(11,8),
+  connection_type TEXT, -- ConnectedToCellular / ConnectedToBase / ...
+  connection_date TIMESTAMPTZ,
+  signal_strength_percent INTEGER,
+  led_color TEXT,
+  led_hex TEXT,
+  source TEXT NOT NULL DEFAULT 'sync' CHECK (source IN ('sync', 'route')),
+  fetched_at TIMESTAMPTZ NOT NULL -- When this state was read from Fi; the staleness bound is checked against it
+);
+
+ALTER TABLE bailey_fi_snapshot ENABLE ROW LEVEL SECURITY;
+
+-- Allow public read/write for now (tighten later)
+CREATE POLICY "Allow all" ON bailey_fi_snapshot FOR ALL USING (true) WITH CHECK (true);
+
+COMMENT ON TABLE bailey_fi_snapshot IS 'Latest Fi collar snapshot per pet, so dashboard refreshes do not each query Fi';
@@ -0,0 +1,16 @@
+-- Bailey Fi Sync State Migration
+-- Per-stream high-water marks for incremental fi-sync.py runs
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+CREATE TABLE IF NOT EXISTS bailey_fi_sync_state (
+  stream TEXT PRIMARY KEY CHECK (stream IN ('activity', 'walks', 'sleep')),
+  watermark TIMESTAMPTZ NOT NULL, -- Newest record synced for this stream
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE bailey_fi_sync_state ENABLE ROW LEVEL SECURITY;
+
+-- Allow public read/write for now (tighten later)
+CREATE POLICY "Allow all" ON bailey_fi_sync_state FOR ALL USING (true) WITH CHECK (true);
+
+COMMENT ON TABLE bailey_fi_sync_state IS 'Fi sync watermarks: the next run only fetches data after these marks';
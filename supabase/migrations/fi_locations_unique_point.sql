@@ -0,0 +1,5 @@
+-- Bailey Fi Locations Migration
+-- One row per walk GPS point, so fi-sync.py can re-send overlapping points safely
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fi_locations_walk_point ON bailey_fi_locations(walk_id, timestamp);
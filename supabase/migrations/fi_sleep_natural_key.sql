@@ -0,0 +1,19 @@
+-- Bailey Fi Sleep Natural Key Migration
+-- One row per (start_time, sleep_type), so syncs upsert sleep periods instead of appending duplicates
+-- The DELETE compacts existing duplicates first (same rule as fi-sleep-compact.py), otherwise the index can't be created
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+-- Keep the longest-running copy of each period; ongoing rests only ever extend
+DELETE FROM bailey_fi_sleep
+WHERE id IN (
+  SELECT id FROM (
+    SELECT id, ROW_NUMBER() OVER (
+      PARTITION BY start_time, sleep_type
+      ORDER BY end_time DESC, duration_minutes DESC, created_at DESC NULLS LAST, id
+    ) AS copy
+    FROM bailey_fi_sleep
+  ) ranked
+  WHERE copy > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fi_sleep_natural_key ON bailey_fi_sleep(start_time, sleep_type);
@@ -0,0 +1,9 @@
+-- Bailey Fi Sync Log Partial Status Migration
+-- Lets a run that finished with rows still spooled or dead-lettered log as 'partial' instead of 'success'
+-- Run this in the Supabase SQL editor: https://supabase.com/dashboard/project/kxqrsdicrayblwpczxsy/editor
+
+ALTER TABLE bailey_fi_sync_log DROP CONSTRAINT IF EXISTS bailey_fi_sync_log_status_check;
+ALTER TABLE bailey_fi_sync_log
+ADD CONSTRAINT bailey_fi_sync_log_status_check CHECK (status IN ('running', 'success', 'partial', 'failed'));
+
+COMMENT ON COLUMN bailey_fi_sync_log.status IS 'partial: the run finished but some rows stayed in the local spool or were dead-lettered (see error_message)';